@@ -1,2 +1,5 @@
+from common.pattern_matcher import PatternMatcher
 FORBIDDEN=["вред","насилие"]
-def check_ethics(text): return not any(k in text.lower() for k in FORBIDDEN)
+MATCHER=PatternMatcher(FORBIDDEN)
+def check_ethics(text): return not MATCHER.matches(text)
+def scan_ethics(text): return list(MATCHER.finditer(text))
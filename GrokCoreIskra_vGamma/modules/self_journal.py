@@ -1,3 +1,4 @@
 import json
-def log_entry(entry):
-    with open("JOURNAL.jsonl","a",encoding="utf-8") as f: f.write(json.dumps(entry, ensure_ascii=False)+"\n")
+def log_entry(entry, writer=None, path="JOURNAL.jsonl"):
+    if writer is not None: return writer.write(entry)
+    with open(path,"a",encoding="utf-8") as f: f.write(json.dumps(entry, ensure_ascii=False)+"\n")
@@ -1,2 +1,12 @@
+import functools
+from pathlib import Path
+from common.persona_router import PersonaRouter, graph_personas, load_graph
+GRAPH_PATH=Path(__file__).resolve().parent.parent/"GRAPH.json"
+DEFAULT="Вирдус"
+# personas and their keywords come from GRAPH.json ("concepts"); keywords match case-sensitively, like the original `"анализ" in query`
+@functools.cache
+def router():
+    graph=load_graph(GRAPH_PATH)
+    return PersonaRouter(graph_personas(graph),DEFAULT,graph,case_sensitive=True)
 class PersonaModule:
-    def select_persona(self, query): return "Лиора" if "анализ" in query else "Вирдус"
+    def select_persona(self, query): return router().route(query)
@@ -1,9 +1,34 @@
+import functools, re
+# in prompts added with template=True, {name} is filled from metrics; braces that are not a bare name, or names absent from metrics, stay as written
+# plain prompts (the default) are kept verbatim, so a literal {D} in their text is never substituted
+PLACEHOLDER=re.compile(r"\{([^{}\s]+)\}")
+def compile_template(text): return tuple(PLACEHOLDER.split(text))  # literals at even, names at odd indexes
 class PromptManager:
-    def __init__(self): self.prompts={}
-    def add_prompt(self,name,text): self.prompts[name]=text
+    def __init__(self,cache_size=4096):
+        self.prompts={}; self.templates={}; self.template_names=set()
+        self._cached=functools.lru_cache(maxsize=cache_size)(self._render_items)
+    def add_prompt(self,name,text,template=False):
+        self.prompts[name]=text
+        if template: self.template_names.add(name)
+        else: self.template_names.discard(name)
+        self._cached.cache_clear()
+    def parts(self,name,text):
+        # compiled lazily and keyed by the source text, so assigning to self.prompts directly still takes effect
+        cached=self.templates.get(name)
+        if cached is None or cached[0]!=text:
+            cached=self.templates[name]=(text,compile_template(text) if name in self.template_names else (text,))
+        return cached[1]
     def get_prompt(self,name,metrics=None):
-        p=self.prompts.get(name,"")
-        metrics = metrics or {}
+        metrics=metrics or {}; text=self.prompts.get(name,"")
+        try: return self._cached(name,text,tuple(sorted((k,type(v),v) for k,v in metrics.items())))
+        except TypeError: return self._render(name,text,metrics)  # unhashable metric values
+    def _render_items(self,name,text,items): return self._render(name,text,{k:v for k,_,v in items})
+    def render(self,name,metrics): return self._render(name,self.prompts.get(name,""),metrics)
+    def _render(self,name,text,metrics):
+        parts=self.parts(name,text)
+        if len(parts)==1: p=parts[0]
+        else: p="".join(part if i%2==0 else (f"{metrics[part]}" if part in metrics else "{"+part+"}") for i,part in enumerate(parts))
         delta=metrics.get("∆","N/A")
         distance=metrics.get("D","N/A")
         return f"{p} [Metrics: ∆={delta}, D={distance}]"
+    def render_many(self,name,metrics_list): return [self.get_prompt(name,metrics) for metrics in metrics_list]
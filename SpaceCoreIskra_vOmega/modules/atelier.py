@@ -1,5 +1,33 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 def score(text):
     words=text.split()
     if not words: return 0.0
     long=[w for w in words if len(w)>6]
     return len(long)/len(words)
+def score_batch(texts):
+    out=[]
+    for text in texts:
+        words=text.split(); n=len(words)
+        out.append(sum(1 for w in words if len(w)>6)/n if n else 0.0)
+    return out
+def iter_scores(texts,jobs=1,batch_size=10000):
+    """Yield score(text) for every text in order; jobs>1 scores batches in a process pool, at most 2*jobs in flight."""
+    texts=iter(texts)
+    batches=iter(lambda: list(islice(texts,max(1,batch_size))),[])
+    if jobs<=1:
+        for batch in batches: yield from score_batch(batch)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending=deque()
+        for batch in batches:
+            pending.append(pool.submit(score_batch,batch))
+            if len(pending)>=2*jobs: yield from pending.popleft().result()
+        while pending: yield from pending.popleft().result()
+def score_many(texts,jobs=1,batch_size=10000,as_array=False):
+    scores=iter_scores(texts,jobs,batch_size)
+    if as_array:
+        import numpy as np
+        return np.fromiter(scores,dtype=np.float64)
+    return list(scores)
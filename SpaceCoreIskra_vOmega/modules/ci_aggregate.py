@@ -1,3 +1,9 @@
 import json
+from common.journal_checkpoint import advance, update_checkpoint
 def aggregate(entries):
     return {"count":len(entries),"facets":list({e.get("facet") for e in entries}),"avg_D":sum(e.get("D",0) for e in entries)/max(1,len(entries))}
+def aggregate_file(path, checkpoint=None):
+    """Same summary as ``aggregate`` read straight from a journal; with a ``checkpoint``
+    sidecar only lines appended since the previous call are parsed."""
+    state = update_checkpoint(path, checkpoint) if checkpoint else advance(path)[1]
+    return {"count":state.count,"facets":sorted(state.facets),"avg_D":state.sums["D"].value/max(1,state.count)}
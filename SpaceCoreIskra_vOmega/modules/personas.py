@@ -1,6 +1,11 @@
+from common.persona_protocol import ConceptIndex
 class Persona:
     def __init__(self,name,concepts):
         self.name=name; self.concepts=set(concepts)
     def distance(self,other):
         union=self.concepts|other.concepts
         return 0.0 if not union else 1.0 - len(self.concepts & other.concepts)/len(union)
+def distance_matrix(personas):
+    return ConceptIndex(p.concepts for p in personas).matrix()
+def distances(persona,personas):
+    return ConceptIndex(p.concepts for p in personas).distances(persona.concepts)
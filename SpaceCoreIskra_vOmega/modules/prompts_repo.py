@@ -1,12 +1,39 @@
-import json, os
+import atexit, json, os
+from common.oplog_store import OpLogStore, write_json_atomic
+MODES=("snapshot","log")
 class PromptsRepo:
-    def __init__(self, path="prompts.json"):
-        self.path = path; self.prompts = {}
+    """mode="snapshot" rewrites prompts.json atomically; mode="log" appends to prompts.json.log
+    and compacts every compact_every prompts. write_behind coalesces saves until flush()/close();
+    durability ("none"/"batch"/"entry") sets how often the log is fsynced."""
+    def __init__(self, path="prompts.json", mode="snapshot", write_behind=False, compact_every=10000, durability="batch"):
+        if mode not in MODES: raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.path=path; self.mode=mode; self.write_behind=write_behind; self.dirty=False; self.store=None
+        if mode=="log":
+            self.store=OpLogStore(path, compact_every=compact_every, write_behind=write_behind, durability=durability)
+            self.prompts=self.store.data
+            return
+        self.prompts={}
         if os.path.exists(self.path):
-            try: self.prompts = json.load(open(self.path,"r",encoding="utf-8"))
-            except Exception: self.prompts = {}
-    def add(self, name, prompt, meta):
-        self.prompts[name] = {"text": prompt, "meta": meta}; self.save()
+            try:
+                with open(self.path,"r",encoding="utf-8") as f: self.prompts=json.load(f)
+            except Exception: self.prompts={}
+        if write_behind: atexit.register(self.flush)
+    def __enter__(self): return self
+    def __exit__(self,*exc): self.close()
+    def add(self, name, prompt, meta): self.add_many([(name,prompt,meta)])
+    def add_many(self, items):
+        batch={name:{"text":prompt,"meta":meta} for name,prompt,meta in items}
+        if self.store is not None: return self.store.update(batch)
+        self.prompts.update(batch); self.dirty=True
+        if not self.write_behind: self.save()
     def save(self):
-        json.dump(self.prompts, open(self.path,"w",encoding="utf-8"), ensure_ascii=False, indent=2)
+        if self.store is not None: return self.store.compact()
+        write_json_atomic(self.path, self.prompts, indent=2); self.dirty=False
+    def flush(self):
+        if self.store is not None: self.store.flush()
+        elif self.dirty: self.save()
+    def close(self):
+        if self.store is not None: return self.store.close()
+        self.flush()
+        if self.write_behind: atexit.unregister(self.flush)
     def get(self, name): return self.prompts.get(name)
@@ -1,6 +1,81 @@
+import heapq
+
+
+def _trigrams(s):
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
 class RAGPanel:
-    def __init__(self): self.docs=[]
-    def add(self,title,text): self.docs.append({"title":title,"text":text})
-    def search(self,q):
-        ql=q.lower()
-        return [d for d in self.docs if ql in d["text"].lower() or ql in d["title"].lower()]
+    """Document panel with linear search or, when ``indexed=True``, a trigram inverted index.
+
+    The indexed mode caches lowercased title/text once at ``add()`` and keeps
+    ``trigram -> doc ids`` postings; candidates are verified with the same
+    substring test as the linear scan, so both modes return the same documents.
+    """
+
+    def __init__(self, indexed=False):
+        self.indexed = indexed
+        self._docs = {}
+        self._norm = {}
+        self._postings = {}
+        self._next_id = 0
+
+    @property
+    def docs(self):
+        return list(self._docs.values())
+
+    def add(self, title, text):
+        doc_id = self._next_id; self._next_id += 1
+        self._docs[doc_id] = {"title": title, "text": text}
+        if self.indexed:
+            norm = (title.lower(), text.lower())
+            self._norm[doc_id] = norm
+            for gram in _trigrams(norm[0]) | _trigrams(norm[1]):
+                self._postings.setdefault(gram, set()).add(doc_id)
+        return doc_id
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None: return False
+        norm = self._norm.pop(doc_id, None)
+        if norm is not None:
+            for gram in _trigrams(norm[0]) | _trigrams(norm[1]):
+                ids = self._postings.get(gram)
+                if ids is None: continue
+                ids.discard(doc_id)
+                if not ids: del self._postings[gram]
+        return True
+
+    def _candidates(self, ql):
+        if len(ql) < 3:
+            return list(self._norm)
+        grams = _trigrams(ql)
+        postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not postings[0]: return []
+        found = set(postings[0])
+        for ids in postings[1:]:
+            found &= ids
+            if not found: return []
+        return sorted(found)
+
+    def _match_ids(self, ql):
+        norm = self._norm
+        return [i for i in self._candidates(ql) if ql in norm[i][1] or ql in norm[i][0]]
+
+    def search(self, q):
+        ql = q.lower()
+        if self.indexed:
+            return [self._docs[i] for i in self._match_ids(ql)]
+        return [d for d in self._docs.values() if ql in d["text"].lower() or ql in d["title"].lower()]
+
+    def top(self, q, k=10, title_weight=2.0):
+        """Return up to ``k`` matching docs ranked by occurrence count (title hits weighted)."""
+        ql = q.lower()
+        if not ql or k <= 0: return []
+        if self.indexed:
+            ids, norm = self._match_ids(ql), self._norm
+        else:
+            norm = {i: (d["title"].lower(), d["text"].lower()) for i, d in self._docs.items()}
+            ids = [i for i, (t, x) in norm.items() if ql in x or ql in t]
+        scored = ((title_weight * norm[i][0].count(ql) + norm[i][1].count(ql), -i) for i in ids)
+        return [self._docs[-neg] for _, neg in heapq.nlargest(k, scored)]
@@ -1,3 +1,4 @@
+from common.stream_trim import TailTrimmer, trim_stream  # streaming, grapheme-safe char/word/token budgets
 def trim(text,max_len=200):
     if not text: return text
     return text[-max_len:]
@@ -1,8 +1,33 @@
 import json, zipfile, os
-def export_md(entries,path):
-    with open(path,"w",encoding="utf-8") as f:
-        for e in entries: f.write(e.get("answer","") + "\\n\\n")
-def zip_files(files,zipname):
-    with zipfile.ZipFile(zipname,"w",zipfile.ZIP_DEFLATED) as z:
-        for f in files:
-            if os.path.exists(f): z.write(f, arcname=os.path.basename(f))
+from pathlib import Path
+from common.journal_io import iter_jsonl
+from common.parallel_zip import file_member, stream_member, write_zip
+FORMATS=("md","jsonl")
+def export_md(entries,path): export_stream(entries,path,"md")  # same bytes as the md members of export_zip
+def zip_files(files,zipname,jobs=4):
+    """Per-type compression (see common.parallel_zip), members read ahead in a thread pool."""
+    write_zip(zipname,[file_member(f,os.path.basename(f)) for f in files if os.path.exists(f)],jobs)
+def journal_entries(path): return (entry for _,entry in iter_jsonl(path))
+def render(entries,fmt="md"):
+    """Yield one str per entry: the answer followed by a blank line (md) or the entry as a JSON line (jsonl)."""
+    if fmt not in FORMATS: raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+    for e in entries: yield e.get("answer","")+"\n\n" if fmt=="md" else json.dumps(e,ensure_ascii=False)+"\n"
+def encoded(entries,fmt="md",batch=1000):
+    buf=[]
+    for line in render(entries,fmt):
+        buf.append(line)
+        if len(buf)>=batch: yield "".join(buf).encode("utf-8"); buf.clear()
+    if buf: yield "".join(buf).encode("utf-8")
+def export_stream(entries,path,fmt="md"):
+    """Stream entries from any iterator (e.g. journal_entries) to a Markdown or JSONL file."""
+    with open(path,"wb") as f:
+        for chunk in encoded(entries,fmt): f.write(chunk)
+def arcnames(journals,fmt):
+    """<parent dir>/<journal stem>.<fmt> per journal, so every bundle's JOURNAL.jsonl gets its own member."""
+    names=[f"{Path(j).resolve().parent.name}/{Path(j).stem}.{fmt}" for j in journals]
+    dupes=sorted({n for n in names if names.count(n)>1})
+    if dupes: raise ValueError(f"journals map to the same archive member: {dupes}")
+    return names
+def export_zip(journals,zipname,fmt="md",jobs=4):
+    """One <parent>/<journal stem>.<fmt> member per journal, rendered straight from the JSONL into the archive."""
+    write_zip(zipname,[stream_member(name,lambda j=j: encoded(journal_entries(j),fmt)) for j,name in zip(journals,arcnames(journals,fmt))],jobs)
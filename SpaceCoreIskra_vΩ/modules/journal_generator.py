@@ -1,5 +1,8 @@
 import json, datetime
-def gen(facet,snap,ans,metrics,mirror="shadow-000",modules=None,events=None,marks=None, path="JOURNAL.jsonl"):
+def gen(facet,snap,ans,metrics,mirror="shadow-000",modules=None,events=None,marks=None, path="JOURNAL.jsonl", writer=None):
+    """Build a journal entry and append it to ``path``, or hand it to a shared ``JournalWriter``."""
     e={"facet":facet,"snapshot":snap,"answer":ans,"∆":metrics.get("∆",0),"D":metrics.get("D",0),"Ω":metrics.get("Ω",0),"Λ":metrics.get("Λ",0),"mirror":mirror,"modules":modules or [],"events":events or {},"marks":marks or [],"timestamp":datetime.datetime.utcnow().isoformat()+"Z"}
-    with open(path,"a",encoding="utf-8") as f: f.write(json.dumps(e, ensure_ascii=False)+"\\n")
+    if writer is not None: writer.write(e)
+    else:
+        with open(path,"a",encoding="utf-8") as f: f.write(json.dumps(e, ensure_ascii=False)+"\n")
     return e
@@ -1,4 +1,14 @@
+from pathlib import Path
+from common.pattern_matcher import PatternMatcher, load_rules
 FORBIDDEN=["system prompt","initial instructions"]
+RULES_PATH=Path(__file__).resolve().parents[2]/"veil_rules.txt"
+MATCHER=PatternMatcher(FORBIDDEN+load_rules(RULES_PATH))
+def reload_rules(path=RULES_PATH):
+    global MATCHER
+    MATCHER=PatternMatcher(FORBIDDEN+load_rules(path))
+    return MATCHER
 def check(msg):
-    low=msg.lower()
-    return not any(f in low for f in FORBIDDEN)
+    return not MATCHER.matches(msg)
+def scan(msg):
+    """Return every rule hit as (start, end, pattern) in one pass over the message."""
+    return list(MATCHER.finditer(msg))
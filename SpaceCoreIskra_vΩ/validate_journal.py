@@ -1,11 +1,28 @@
-import json, sys
+import argparse, json, sys
+from pathlib import Path
+REPO_ROOT = Path(__file__).resolve().parents[1]  # same bootstrap as tools/: runs from a plain checkout
+if str(REPO_ROOT) not in sys.path: sys.path.insert(0, str(REPO_ROOT))
+from common.journal_io import iter_lines, map_shards
 def validate(line):
     e = json.loads(line)
     assert -3 <= e["∆"] <= 3
     assert 0 <= e["D"] <= 9
     assert -3 <= e["Ω"] <= 3
     assert e["Λ"] >= 0
-for l in sys.stdin:
-    if l.strip():
-        try: validate(l)
-        except Exception as ex: print("ERR", ex)
+def check_lines(lines):
+    out = []
+    for l in lines:
+        if l.strip():
+            try: validate(l)
+            except Exception as ex: out.append(f"ERR {ex}")
+    return out
+def check_shard(path, start, end):
+    return check_lines(raw.decode("utf-8") for raw in iter_lines(path, start, end))
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Validate journal metrics (stdin or file)")
+    ap.add_argument("path", nargs="?", help="JOURNAL.jsonl; reads stdin when omitted")
+    ap.add_argument("--jobs", type=int, default=1, help="check byte-range shards of PATH in N processes")
+    args = ap.parse_args()
+    if args.path: results = [m for shard in map_shards(args.path, check_shard, args.jobs) for m in shard]
+    else: results = check_lines(raw.decode("utf-8") for raw in sys.stdin.buffer)  # lines end at \n, as in journal_io
+    for m in results: print(m)
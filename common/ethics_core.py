@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+from common.pattern_matcher import Match, PatternMatcher
+
 FORBIDDEN = {
     "насилие",
     "разжигание",
@@ -11,6 +15,12 @@ FORBIDDEN = {
 }
 
 
+MATCHER = PatternMatcher(FORBIDDEN)
+
+
 def is_allowed(text: str) -> bool:
-    lowercase = (text or "").lower()
-    return not any(word in lowercase for word in FORBIDDEN)
+    return not MATCHER.matches(text or "")
+
+
+def violations(text: str) -> list[Match]:
+    return list(MATCHER.finditer(text or ""))
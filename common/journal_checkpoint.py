@@ -0,0 +1,233 @@
+"""Persisted aggregation checkpoints for append-only journals.
+
+A checkpoint records how far a journal has been folded into running
+aggregates: the byte offset of the last complete line, the number of raw lines
+and entries seen, exact per-metric sums and the facet set.  It also keeps the
+SHA-256 of the last folded line so a truncated or rewritten journal is
+detected and re-aggregated from scratch instead of producing stale numbers.
+Later runs only parse the bytes appended since the previous checkpoint.
+
+For a segmented journal the checkpoint also counts the sealed segments it
+covers.  Their aggregates come from the per-segment summaries in the segment
+manifest, so sealed segments are never decompressed just to aggregate, and
+a rotation invalidates the checkpoint.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from common.journal_io import ExactSum, JournalDecodeError, Segment, iter_lines, sealed_segments
+
+METRICS = ("∆", "D", "Ω", "Λ")
+VERSION = 2
+
+
+@dataclass
+class JournalCheckpoint:
+    offset: int = 0
+    tail_start: int = 0
+    tail_sha256: str = ""
+    lines: int = 0
+    count: int = 0
+    sums: dict[str, ExactSum] = field(default_factory=lambda: {m: ExactSum() for m in METRICS})
+    facets: set[str] = field(default_factory=set)
+    sealed: int = 0
+
+    def add(self, entry: object) -> None:
+        """Count a decoded line; only objects contribute facets and numeric metrics."""
+        self.count += 1
+        if not isinstance(entry, dict):
+            return
+        self.facets.add(entry.get("facet", ""))
+        for metric in METRICS:
+            value = entry.get(metric, 0)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.sums[metric].add(value)
+
+    def absorb(self, segment: Segment) -> None:
+        """Fold a sealed segment in from its manifest summary."""
+        self.lines += segment.lines
+        self.count += segment.summary["count"]
+        for metric in METRICS:
+            self.sums[metric].merge(ExactSum.from_dict(segment.summary["sums"].get(metric, {})))
+        self.facets.update(segment.summary["facets"])
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sums": {metric: total.to_dict() for metric, total in self.sums.items()},
+            "facets": sorted(self.facets),
+        }
+
+    def mean(self, metric: str) -> float:
+        return self.sums[metric].mean(self.count)
+
+    def copy(self) -> JournalCheckpoint:
+        return JournalCheckpoint.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {
+            "version": VERSION,
+            "offset": self.offset,
+            "tail_start": self.tail_start,
+            "tail_sha256": self.tail_sha256,
+            "lines": self.lines,
+            "count": self.count,
+            "sums": {metric: total.to_dict() for metric, total in self.sums.items()},
+            "facets": sorted(self.facets),
+            "sealed": self.sealed,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> JournalCheckpoint:
+        if payload.get("version") != VERSION:
+            return cls()
+        return cls(
+            offset=payload["offset"],
+            tail_start=payload["tail_start"],
+            tail_sha256=payload["tail_sha256"],
+            lines=payload["lines"],
+            count=payload["count"],
+            sums={m: ExactSum.from_dict(payload["sums"].get(m, {})) for m in METRICS},
+            facets=set(payload["facets"]),
+            sealed=payload["sealed"],
+        )
+
+    def matches(self, path: str | Path) -> bool:
+        """True when the journal still contains the bytes this checkpoint covered."""
+        if len(sealed_segments(path)) != self.sealed:
+            return False
+        if self.offset == 0:
+            return True
+        if os.path.getsize(path) < self.offset:
+            return False
+        with open(path, "rb") as handle:
+            handle.seek(self.tail_start)
+            tail = handle.read(self.offset - self.tail_start)
+        return hashlib.sha256(tail).hexdigest() == self.tail_sha256
+
+
+def advance(
+    path: str | Path,
+    checkpoint: JournalCheckpoint | None = None,
+    on_entry: Callable[[int, dict], None] | None = None,
+) -> tuple[JournalCheckpoint, JournalCheckpoint]:
+    """Fold lines appended after ``checkpoint`` into its aggregates.
+
+    Returns ``(persistable, current)``: the first only covers newline-terminated
+    lines and is safe to store; the second also includes a trailing line that a
+    writer may still be appending, so it reflects the file as it is right now.
+    ``on_entry(offset, entry)`` is called for every newline-terminated object
+    entry; offsets count the uncompressed bytes of sealed segments before the
+    file.  Without ``on_entry`` sealed segments are folded from their summaries.
+    A trailing line that does not decode yet is treated as not yet written.
+    """
+    segments = sealed_segments(path)
+    if checkpoint is not None and checkpoint.matches(path):
+        state = checkpoint.copy()
+    else:
+        state = _sealed_state(segments, on_entry)
+    base = sum(segment.size for segment in segments)
+    for raw in iter_lines(path, state.offset):
+        if not raw.endswith(b"\n"):
+            current = state.copy()
+            try:
+                _fold(path, current, raw)
+            except (JournalDecodeError, UnicodeDecodeError):
+                return state, state  # a writer is still in the middle of this line
+            return state, current
+        entry = _fold(path, state, raw)
+        if isinstance(entry, dict) and on_entry is not None:
+            on_entry(base + state.offset, entry)
+        state.tail_start = state.offset
+        state.offset += len(raw)
+        state.tail_sha256 = hashlib.sha256(raw).hexdigest()
+    return state, state
+
+
+def _sealed_state(
+    segments: list[Segment], on_entry: Callable[[int, dict], None] | None
+) -> JournalCheckpoint:
+    state = JournalCheckpoint(sealed=len(segments))
+    base = 0
+    for segment in segments:
+        if on_entry is None:
+            state.absorb(segment)
+        else:
+            position = base
+            for raw in iter_lines(segment.path):
+                entry = _fold(segment.path, state, raw)
+                if isinstance(entry, dict):
+                    on_entry(position, entry)
+                position += len(raw)
+        base += segment.size
+    return state
+
+
+def summarize(path: str | Path, lines: Iterable[bytes] | None = None) -> tuple[int, dict]:
+    """``(lines, summary)`` of one journal file (or its raw ``lines``) for the segment manifest."""
+    state = JournalCheckpoint()
+    for raw in iter_lines(path) if lines is None else lines:
+        _fold(path, state, raw)
+    return state.lines, state.summary()
+
+
+def _fold(path: str | Path, state: JournalCheckpoint, raw: bytes) -> object:
+    state.lines += 1
+    payload = raw.decode("utf-8").strip()
+    if not payload:
+        return None
+    try:
+        entry = json.loads(payload)
+    except json.JSONDecodeError as exc:
+        raise JournalDecodeError(path, state.lines, exc) from exc
+    state.add(entry)
+    return entry
+
+
+def load_checkpoints(path: str | Path) -> dict[str, JournalCheckpoint]:
+    """Read a sidecar holding one checkpoint per role (e.g. ``main``/``shadow``)."""
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {role: JournalCheckpoint.from_dict(data) for role, data in payload.items()}
+
+
+def line_anchor(
+    journal: str | Path, sidecar: str | Path, role: str = "main"
+) -> tuple[int, int] | None:
+    """``(offset, lines)`` of the stored ``role`` checkpoint while it still matches ``journal``.
+
+    Suitable as the ``anchor`` of :func:`common.journal_io.tail_jsonl`.
+    """
+    checkpoint = load_checkpoints(sidecar).get(role)
+    if checkpoint is None or not checkpoint.matches(journal):
+        return None
+    return checkpoint.offset, checkpoint.lines
+
+
+def save_checkpoints(path: str | Path, checkpoints: dict[str, JournalCheckpoint]) -> None:
+    """Atomically replace the sidecar so a crash never leaves a torn checkpoint."""
+    target = Path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    payload = {role: checkpoint.to_dict() for role, checkpoint in checkpoints.items()}
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def update_checkpoint(
+    journal: str | Path, sidecar: str | Path, role: str = "main"
+) -> JournalCheckpoint:
+    """Advance and persist the ``role`` checkpoint of ``sidecar``; return current aggregates."""
+    checkpoints = load_checkpoints(sidecar)
+    persistable, current = advance(journal, checkpoints.get(role))
+    checkpoints[role] = persistable
+    save_checkpoints(sidecar, checkpoints)
+    return current
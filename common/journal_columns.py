@@ -0,0 +1,235 @@
+"""Columnar companion store for fast metric queries over ``JOURNAL.jsonl``.
+
+The store keeps one ``array('d')`` column per metric (missing or non-numeric
+values become NaN and are skipped by queries), dictionary-encoded ``facet`` and
+``mirror`` columns and the byte offset of every entry's line, so analytics such
+as "avg D by facet over the last 10k entries" never touch JSON.  ``sync()``
+reuses :mod:`common.journal_checkpoint` to parse only lines appended since the
+previous sync and rebuilds from scratch when the journal was rewritten.
+
+On disk the store is a single file: a length-prefixed JSON header followed by
+the raw column bytes in native byte order.  When NumPy is installed queries are
+vectorised (``bincount`` for counts, sums and means, ``reduceat`` for min/max);
+the pure-Python fallback sums with ``math.fsum`` and agrees up to float rounding.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+from array import array
+from pathlib import Path
+
+from common.journal_checkpoint import METRICS, JournalCheckpoint, advance
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None  # type: ignore[assignment]
+
+MAGIC = b"ISKRACOL"
+FORMAT_VERSION = 1
+CATEGORICAL = ("facet", "mirror")
+AGGREGATES = ("mean", "sum", "count", "min", "max")
+
+
+class ColumnarJournal:
+    def __init__(self, journal: str | Path) -> None:
+        self.journal = Path(journal)
+        self._reset()
+
+    def _reset(self) -> None:
+        self.checkpoint = JournalCheckpoint()
+        self.offsets = array("q")
+        self.metrics = {metric: array("d") for metric in METRICS}
+        self.codes = {name: array("i") for name in CATEGORICAL}
+        self.values: dict[str, list[str]] = {name: [] for name in CATEGORICAL}
+        self._lookup: dict[str, dict[str, int]] = {name: {} for name in CATEGORICAL}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    # --- building -------------------------------------------------------------------------
+
+    @classmethod
+    def open(cls, journal: str | Path, store: str | Path | None = None) -> ColumnarJournal:
+        """Load ``store`` when it exists, then sync it with ``journal`` (saving if given)."""
+        columns = cls.load(store, journal) if store and Path(store).exists() else cls(journal)
+        if columns.sync() and store:
+            columns.save(store)
+        return columns
+
+    def sync(self) -> int:
+        """Append entries written since the last sync; return how many were added."""
+        before = len(self)
+        if not self.checkpoint.matches(self.journal):
+            self._reset()
+            before = 0
+        self.checkpoint, _ = advance(self.journal, self.checkpoint, self._append)
+        return len(self) - before
+
+    def _append(self, offset: int, entry: dict) -> None:
+        self.offsets.append(offset)
+        for metric, column in self.metrics.items():
+            value = entry.get(metric)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                column.append(float(value))
+            else:
+                column.append(math.nan)
+        for name in CATEGORICAL:
+            self.codes[name].append(self._encode(name, entry.get(name)))
+
+    def _encode(self, name: str, value: object) -> int:
+        key = "" if value is None else str(value)
+        lookup = self._lookup[name]
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(self.values[name])
+            self.values[name].append(key)
+        return code
+
+    # --- persistence ----------------------------------------------------------------------
+
+    def _columns(self) -> dict[str, array]:
+        columns: dict[str, array] = {"offsets": self.offsets}
+        columns.update({f"metric:{m}": col for m, col in self.metrics.items()})
+        columns.update({f"code:{n}": col for n, col in self.codes.items()})
+        return columns
+
+    def save(self, path: str | Path) -> None:
+        columns = self._columns()
+        header = json.dumps(
+            {
+                "version": FORMAT_VERSION,
+                "checkpoint": self.checkpoint.to_dict(),
+                "values": self.values,
+                "columns": [[name, col.typecode, len(col)] for name, col in columns.items()],
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        target = Path(path)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for column in columns.values():
+                column.tofile(handle)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str | Path, journal: str | Path) -> ColumnarJournal:
+        columns = cls(journal)
+        with open(path, "rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                return columns
+            (size,) = struct.unpack("<Q", handle.read(8))
+            header = json.loads(handle.read(size).decode("utf-8"))
+            if header.get("version") != FORMAT_VERSION:
+                return columns
+            target = columns._columns()
+            for name, typecode, length in header["columns"]:
+                column = target[name]
+                if column.typecode != typecode:
+                    return cls(journal)
+                column.fromfile(handle, length)
+        columns.checkpoint = JournalCheckpoint.from_dict(header["checkpoint"])
+        columns.values = header["values"]
+        columns._lookup = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in columns.values.items()
+        }
+        return columns
+
+    # --- queries --------------------------------------------------------------------------
+
+    def query(
+        self,
+        metric: str,
+        *,
+        agg: str = "mean",
+        by: str | None = None,
+        last: int | None = None,
+        where: dict[str, str] | None = None,
+    ) -> float | dict[str, float]:
+        """Aggregate ``metric`` over the last ``last`` entries, optionally grouped ``by`` a
+        categorical column and filtered by exact categorical matches in ``where``."""
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {AGGREGATES}, got {agg!r}")
+        start = max(0, len(self) - last) if last else 0
+        filters = []
+        for name, value in (where or {}).items():
+            code = self._lookup[name].get(value)
+            if code is None:
+                return {} if by else _reduce(agg, [])
+            filters.append((self.codes[name], code))
+        keys = self.codes[by] if by else None
+        if np is not None:
+            result = self._aggregate_numpy(agg, self.metrics[metric], keys, start, filters)
+        else:
+            grouped = self._group_python(self.metrics[metric], keys, start, filters)
+            result = {key: _reduce(agg, values) for key, values in grouped.items()}
+        if by is None:
+            return result.get(0, _reduce(agg, []))
+        names = self.values[by]
+        return {names[key]: value for key, value in sorted(result.items())}
+
+    def _group_python(
+        self, values: array, keys: array | None, start: int, filters: list[tuple[array, int]]
+    ) -> dict[int, list[float]]:
+        grouped: dict[int, list[float]] = {}
+        for row in range(start, len(self)):
+            value = values[row]
+            if math.isnan(value) or any(col[row] != code for col, code in filters):
+                continue
+            grouped.setdefault(keys[row] if keys is not None else 0, []).append(value)
+        return grouped
+
+    def _aggregate_numpy(
+        self,
+        agg: str,
+        values: array,
+        keys: array | None,
+        start: int,
+        filters: list[tuple[array, int]],
+    ) -> dict[int, float]:
+        column = np.frombuffer(values, dtype=np.float64)[start:]
+        mask = ~np.isnan(column)
+        for codes, code in filters:
+            mask &= np.frombuffer(codes, dtype=np.intc)[start:] == code
+        column = column[mask]
+        if not column.size:
+            return {}
+        group_keys: np.ndarray
+        if keys is None:
+            group_keys = np.zeros(column.size, dtype=np.intc)
+        else:
+            group_keys = np.frombuffer(keys, dtype=np.intc)[start:][mask]
+        if agg in ("min", "max"):
+            order = np.argsort(group_keys, kind="stable")
+            unique, first = np.unique(group_keys[order], return_index=True)
+            extreme = np.minimum if agg == "min" else np.maximum
+            totals = extreme.reduceat(column[order], first)
+        else:
+            counts = np.bincount(group_keys)
+            unique = np.flatnonzero(counts)
+            if agg == "count":
+                totals = counts[unique]
+            else:
+                totals = np.bincount(group_keys, weights=column)[unique]
+                if agg == "mean":
+                    totals = totals / counts[unique]
+        return dict(zip(unique.tolist(), totals.tolist()))
+
+
+def _reduce(agg: str, values: list[float]) -> float:
+    """Aggregate one group on the pure-Python path."""
+    if agg == "count":
+        return len(values)
+    if agg == "sum":
+        return math.fsum(values)
+    if not values:
+        return math.nan
+    if agg == "mean":
+        return math.fsum(values) / len(values)
+    return min(values) if agg == "min" else max(values)
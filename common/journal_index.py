@@ -0,0 +1,271 @@
+"""Sidecar index from ``mirror``, mark id and ``facet`` to journal byte offsets.
+
+``JournalIndex`` answers "which entries have mirror ``shadow-002``" (or mark
+``M-002``, or facet ``Лиора``) without scanning the journal: the key's hash
+selects a bucket of a directory, the key's run of line offsets is found
+inside the bucket, and every offset is read back with one ``seek`` +
+``readline``.
+
+``sync()`` reuses :mod:`common.journal_checkpoint` to parse only lines
+appended since the previous sync (rebuilding from scratch when the journal
+was rewritten or rotated) and keeps the new postings in memory, where
+lookups already see them, until ``save()`` merges them into the sidecar.
+Offsets are logical: they count the uncompressed bytes of sealed segments
+first (see :mod:`common.journal_segments`), so lookups into the live file
+and uncompressed segments are constant-time while compressed segments are
+decompressed up to the offset.
+
+On disk the index is a single file memory-mapped on load: ``MAGIC``, a
+length-prefixed JSON header padded to 8 bytes, then ``buckets + 1`` bucket
+starts, the key hashes and the line offsets of every posting, sorted by
+hash (the top bits of which are the bucket) and then by offset.  Keys are
+compared by their 64-bit BLAKE2b hash; entries read back are checked
+against the key, so a hash collision never returns a wrong entry.  NumPy
+merges postings on ``save()`` when it is installed; the pure-Python path
+writes the same file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from itertools import accumulate
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from common.journal_checkpoint import JournalCheckpoint, advance
+from common.journal_io import open_binary, sealed_segments
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+MAGIC = b"ISKRAIDX"
+FORMAT_VERSION = 1
+KINDS = ("mirror", "mark", "facet")
+SUFFIX = ".idx"
+
+Column = memoryview | array
+
+
+def entry_keys(entry: dict) -> Iterator[tuple[str, str]]:
+    """The ``(kind, value)`` pairs an entry is indexed under."""
+    for kind in ("mirror", "facet"):
+        value = entry.get(kind)
+        if isinstance(value, str) and value:
+            yield kind, value
+    marks = entry.get("marks")
+    for mark in marks if isinstance(marks, list) else ():
+        if isinstance(mark, dict) and isinstance(mark.get("id"), str) and mark["id"]:
+            yield "mark", mark["id"]
+
+
+def key_hash(kind: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{kind}\0{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _bucket_bits(postings: int) -> int:
+    """About one posting per bucket, at least 8 buckets."""
+    return max(3, (postings - 1).bit_length())
+
+
+class JournalIndex:
+    def __init__(self, journal: str | Path, path: str | Path | None = None) -> None:
+        self.journal = Path(journal)
+        self.path = Path(path) if path else self.journal.with_name(self.journal.name + SUFFIX)
+        self._map: mmap.mmap | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.close()
+        self.checkpoint = JournalCheckpoint()
+        self._bits = _bucket_bits(0)
+        self._buckets: Column = array("Q", bytes(8 * ((1 << self._bits) + 1)))
+        self._hashes: Column = array("Q")
+        self._offsets: Column = array("q")
+        self._pending: dict[int, list[int]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of postings, i.e. ``(key, line)`` pairs."""
+        return len(self._hashes) + sum(map(len, self._pending.values()))
+
+    def close(self) -> None:
+        if self._map is not None:
+            # The column views must be released before the map can be closed.
+            self._buckets, self._hashes, self._offsets = array("Q"), array("Q"), array("q")
+            self._map.close()
+            self._map = None
+
+    # --- building -------------------------------------------------------------------------
+
+    @classmethod
+    def open(cls, journal: str | Path, path: str | Path | None = None) -> JournalIndex:
+        """Load the sidecar when it exists, then sync it with the journal (saving if changed)."""
+        index = cls(journal, path)
+        if index.path.exists():
+            index.load()
+        if index.sync():
+            index.save()
+        return index
+
+    def sync(self) -> int:
+        """Index entries written since the last sync; return how many were added."""
+        if not self.checkpoint.matches(self.journal):
+            self._reset()
+        added = 0
+
+        def add(offset: int, entry: dict) -> None:
+            nonlocal added
+            added += 1
+            for kind, value in entry_keys(entry):
+                self._pending.setdefault(key_hash(kind, value), []).append(offset)
+
+        self.checkpoint, _ = advance(self.journal, self.checkpoint, add)
+        return added
+
+    def _merged(self) -> tuple[array, array]:
+        """Stored and pending postings as ``(hashes, offsets)`` sorted by hash, then offset."""
+        # Pending offsets all follow the stored ones, so a stable sort by hash suffices.
+        new = sorted((hashed, offset) for hashed, run in self._pending.items() for offset in run)
+        if np is not None:
+            hashes = np.concatenate(
+                [np.frombuffer(self._hashes, np.uint64), np.array([h for h, _ in new], np.uint64)]
+            )
+            offsets = np.concatenate(
+                [np.frombuffer(self._offsets, np.int64), np.array([o for _, o in new], np.int64)]
+            )
+            order = np.argsort(hashes, kind="stable")
+            return array("Q", hashes[order].tobytes()), array("q", offsets[order].tobytes())
+        hashes, offsets = array("Q"), array("q")
+        for hashed, offset in heapq.merge(zip(self._hashes, self._offsets), new):
+            hashes.append(hashed)
+            offsets.append(offset)
+        return hashes, offsets
+
+    @staticmethod
+    def _bucket_starts(hashes: array, bits: int) -> array:
+        shift = 64 - bits
+        if np is not None:
+            bounds = np.arange(1 << bits, dtype=np.uint64) << np.uint64(shift)
+            starts = np.searchsorted(np.frombuffer(hashes, np.uint64), bounds)
+            return array("Q", starts.astype(np.uint64).tobytes()) + array("Q", [len(hashes)])
+        counts = [0] * (1 << bits)
+        for hashed in hashes:
+            counts[hashed >> shift] += 1
+        return array("Q", [0, *accumulate(counts)])
+
+    def save(self) -> None:
+        """Merge pending postings into the sidecar, write it atomically and map it again."""
+        hashes, offsets = self._merged()
+        bits = _bucket_bits(len(hashes))
+        buckets = self._bucket_starts(hashes, bits)
+        header = json.dumps(
+            {
+                "version": FORMAT_VERSION,
+                "checkpoint": self.checkpoint.to_dict(),
+                "bits": bits,
+                "postings": len(hashes),
+                "byteorder": sys.byteorder,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for column in (buckets, hashes, offsets):
+                column.tofile(handle)
+        self.close()
+        os.replace(tmp, self.path)
+        self.load()
+
+    def load(self) -> bool:
+        """Memory-map the sidecar; ``False`` (and an empty index) when it is unusable."""
+        self._reset()
+        with open(self.path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size <= len(MAGIC) + 8:
+                return False
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        header: dict = {}
+        if data[: len(MAGIC)] == MAGIC:
+            (size,) = struct.unpack_from("<Q", data, len(MAGIC))
+            start = len(MAGIC) + 8 + size
+            header = json.loads(bytes(data[len(MAGIC) + 8 : start]).decode("utf-8"))
+        if header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            data.close()
+            return False
+        self._map = data
+        view = memoryview(data)
+        self._bits, postings = header["bits"], header["postings"]
+        hashes = start + 8 * ((1 << self._bits) + 1)
+        offsets = hashes + 8 * postings
+        self._buckets = view[start:hashes].cast("Q")
+        self._hashes = view[hashes:offsets].cast("Q")
+        self._offsets = view[offsets : offsets + 8 * postings].cast("q")
+        self.checkpoint = JournalCheckpoint.from_dict(header["checkpoint"])
+        return True
+
+    # --- lookups --------------------------------------------------------------------------
+
+    def offsets(self, kind: str, value: str) -> list[int]:
+        """Logical offsets of the lines indexed under ``kind``/``value``, in journal order."""
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+        hashed = key_hash(kind, value)
+        bucket = hashed >> (64 - self._bits)
+        lo, hi = self._buckets[bucket], self._buckets[bucket + 1]
+        first = bisect_left(self._hashes, hashed, lo, hi)
+        last = bisect_right(self._hashes, hashed, first, hi)
+        return [*self._offsets[first:last], *self._pending.get(hashed, ())]
+
+    def lookup(self, kind: str, value: str, limit: int | None = None) -> list[dict]:
+        """Entries indexed under ``kind``/``value``; with ``limit`` only the newest ones."""
+        offsets = self.offsets(kind, value)
+        if not limit:
+            return [entry for entry in self._read(offsets) if (kind, value) in entry_keys(entry)]
+        newest: list[dict] = []
+        for entry in self._read(reversed(offsets)):
+            if (kind, value) in entry_keys(entry):
+                newest.append(entry)
+                if len(newest) == limit:
+                    break
+        return newest[::-1]
+
+    def get(self, kind: str, value: str) -> dict | None:
+        """The newest entry indexed under ``kind``/``value``."""
+        newest = self.lookup(kind, value, limit=1)
+        return newest[0] if newest else None
+
+    def _read(self, offsets: Iterable[int]) -> Iterator[dict]:
+        segments = sealed_segments(self.journal)
+        paths = [segment.path for segment in segments] + [self.journal]
+        bases = [0, *accumulate(segment.size for segment in segments)]
+        with ExitStack() as stack:
+            handles: dict[int, BinaryIO] = {}
+            for offset in offsets:
+                part = bisect_right(bases, offset) - 1
+                if part not in handles:
+                    handles[part] = stack.enter_context(open_binary(paths[part]))
+                handle = handles[part]
+                handle.seek(offset - bases[part])
+                yield json.loads(handle.readline())
@@ -0,0 +1,345 @@
+"""Low-level JSONL journal readers shared by the CI tools and bundle modules.
+
+Everything here streams: readers never hold more than one block or the
+requested tail in memory, so multi-GB journals can be validated or
+aggregated with flat memory use.
+
+A journal may be segmented (see :mod:`common.journal_segments`): older lines
+live in sealed, possibly compressed segments listed in
+``<journal>.segments/manifest.json`` and only the newest ones in the journal
+file itself.  ``iter_jsonl``, ``tail_jsonl`` and ``map_shards`` read the
+sealed segments first, numbering lines across the whole journal; the
+offset-based helpers work on the single file they are given, opening
+``.gz``/``.zst`` segments transparently.
+
+Every reader splits lines on ``\n`` alone, as the byte offsets, checkpoints and
+segment line counts do; a ``\r`` is just whitespace before it.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import math
+import os
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from fractions import Fraction
+from itertools import pairwise
+from pathlib import Path
+from typing import BinaryIO, TypeVar
+
+BLOCK_SIZE = 1 << 20
+SEGMENTS_SUFFIX = ".segments"
+MANIFEST_NAME = "manifest.json"
+
+Entry = tuple[int, dict]
+T = TypeVar("T")
+
+
+class JournalDecodeError(ValueError):
+    """A journal line is not valid JSON."""
+
+    def __init__(self, path: str | Path, line_no: int, error: json.JSONDecodeError) -> None:
+        super().__init__(f"{path}:{line_no} invalid JSON: {error}")
+        self.path = str(path)
+        self.line_no = line_no
+        self.error = error
+
+
+def _decode(path: str | Path, line_no: int, payload: str) -> dict:
+    try:
+        return json.loads(payload)
+    except json.JSONDecodeError as exc:
+        raise JournalDecodeError(path, line_no, exc) from exc
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A sealed journal segment as recorded in the segment manifest."""
+
+    path: Path
+    lines: int
+    entries: int
+    size: int  # uncompressed bytes
+    summary: dict
+
+
+def segment_dir(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + SEGMENTS_SUFFIX)
+
+
+def read_manifest(path: str | Path) -> dict:
+    """The segment manifest of journal ``path``; empty when it was never rotated."""
+    try:
+        with open(segment_dir(path) / MANIFEST_NAME, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {"segments": []}
+
+
+def sealed_segments(path: str | Path) -> list[Segment]:
+    directory = segment_dir(path)
+    return [
+        Segment(
+            directory / item["file"], item["lines"], item["entries"], item["bytes"], item["summary"]
+        )
+        for item in read_manifest(path)["segments"]
+        if not item.get("pending")
+    ]
+
+
+def open_binary(path: str | Path) -> BinaryIO:
+    """Open a journal file for reading, decompressing ``.gz`` and ``.zst`` segments."""
+    suffix = Path(path).suffix
+    if suffix == ".gz":
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    if suffix == ".zst":
+        import zstandard  # optional: only needed for zstd-compressed segments
+
+        decompressor = zstandard.ZstdDecompressor()
+        # The stream reader cannot iterate lines itself; buffering adds readline().
+        return io.BufferedReader(decompressor.stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb")
+
+
+def iter_jsonl(path: str | Path) -> Iterator[Entry]:
+    """Yield ``(line_no, entry)`` for every non-blank line, one line at a time.
+
+    Sealed segments come first; line numbers continue across them.
+    """
+    base = 0
+    for segment in sealed_segments(path):
+        yield from _iter_file(segment.path, base)
+        base += segment.lines
+    yield from _iter_file(path, base)
+
+
+def _iter_file(path: str | Path, base: int) -> Iterator[Entry]:
+    with open_binary(path) as handle:
+        for line_no, line in enumerate(handle, base + 1):
+            payload = line.decode("utf-8").strip()
+            if payload:
+                yield line_no, _decode(path, line_no, payload)
+
+
+def count_newlines(path: str | Path, end: int | None = None, start: int = 0) -> int:
+    """Count ``\\n`` bytes in ``[start, end)`` without decoding anything."""
+    total = 0
+    with open_binary(path) as handle:
+        handle.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            size = BLOCK_SIZE if remaining is None else min(BLOCK_SIZE, remaining)
+            chunk = handle.read(size)
+            if not chunk:
+                break
+            total += chunk.count(b"\n")
+            if remaining is not None:
+                remaining -= len(chunk)
+    return total
+
+
+def tail_lines(
+    path: str | Path, count: int, block_size: int = BLOCK_SIZE
+) -> tuple[int, list[bytes]]:
+    """Read raw lines backwards from EOF until ``count`` non-blank ones are found.
+
+    Returns the byte offset of the first returned line and the lines in file
+    order (blank lines in between are kept so line numbers can be derived).
+    """
+    if count <= 0:
+        return os.path.getsize(path), []
+    with open(path, "rb") as handle:
+        position = handle.seek(0, os.SEEK_END)
+        if position == 0:
+            return 0, []
+        handle.seek(position - 1)
+        if handle.read(1) == b"\n":
+            position -= 1
+        end = position
+        carry = b""
+        lines: list[bytes] = []
+        found = 0
+        while found < count and position > 0:
+            step = min(block_size, position)
+            position -= step
+            handle.seek(position)
+            pieces = (handle.read(step) + carry).split(b"\n")
+            carry = pieces[0]
+            for piece in reversed(pieces[1:]):
+                lines.append(piece)
+                if piece.strip():
+                    found += 1
+                    if found == count:
+                        break
+        if found < count:
+            lines.append(carry)
+        lines.reverse()
+        start = end - sum(len(line) + 1 for line in lines) + 1
+        return start, lines
+
+
+def tail_jsonl(
+    path: str | Path,
+    count: int,
+    block_size: int = BLOCK_SIZE,
+    anchor: tuple[int, int] | None = None,
+) -> list[Entry]:
+    """Parse only the last ``count`` non-blank lines, with their 1-based line numbers.
+
+    When the journal file holds fewer, the newest sealed segments make up the rest.
+    Numbering a tail that starts mid-file means counting the newlines before it;
+    ``anchor`` is ``(offset, lines)``, a line boundary in the journal file and the
+    number of lines before it, sealed segments included (e.g. a stored
+    ``JournalCheckpoint``'s ``offset`` and ``lines``), so only the bytes between
+    it and the tail are counted instead of the whole prefix.
+    """
+    segments = sealed_segments(path)
+    base = sum(segment.lines for segment in segments)
+    start, lines = tail_lines(path, count, block_size)
+    if start == 0:
+        line_no = base
+    elif anchor is None:
+        line_no = base + count_newlines(path, start)
+    elif anchor[0] <= start:
+        line_no = anchor[1] + count_newlines(path, start, anchor[0])
+    else:
+        line_no = anchor[1] - count_newlines(path, anchor[0], start)
+    entries: list[Entry] = []
+    for raw in lines:
+        line_no += 1
+        payload = raw.decode("utf-8").strip()
+        if payload:
+            entries.append((line_no, _decode(path, line_no, payload)))
+    for segment in reversed(segments):
+        missing = count - len(entries)
+        if missing <= 0:
+            break
+        base -= segment.lines
+        newest: deque[Entry] = deque(maxlen=missing)
+        newest.extend(_iter_file(segment.path, base))
+        entries[:0] = newest
+    return entries
+
+
+def shard_ranges(path: str | Path, shards: int) -> list[tuple[int, int]]:
+    """Split a file into at most ``shards`` byte ranges that start on line boundaries."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as handle:
+        for index in range(1, max(1, shards)):
+            target = size * index // shards
+            if target <= bounds[-1]:
+                continue
+            handle.seek(target - 1)
+            handle.readline()
+            position = handle.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+    bounds.append(size)
+    return list(pairwise(bounds))
+
+
+def iter_lines(path: str | Path, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+    """Yield raw lines (newline included) whose first byte lies in ``[start, end)``."""
+    with open_binary(path) as handle:
+        handle.seek(start)
+        position = start
+        for line in handle:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line
+
+
+def map_shards(
+    path: str | Path,
+    worker: Callable[[str, int, int], T],
+    jobs: int = 1,
+    shards_per_job: int = 4,
+) -> list[T]:
+    """Run ``worker(path, start, end)`` over line-aligned shards, in file order.
+
+    With ``jobs <= 1`` the whole file is a single shard processed in-process,
+    so serial and parallel runs share one code path.  Each sealed segment is
+    one more shard, placed before the journal file's own.  ``worker`` must be a
+    module-level callable when ``jobs > 1`` (it is sent to a process pool).
+    """
+    tasks = [(str(segment.path), 0, segment.size) for segment in sealed_segments(path)]
+    if jobs <= 1:
+        tasks.append((str(path), 0, os.path.getsize(path)))
+        return [worker(*task) for task in tasks]
+    tasks += [(str(path), start, end) for start, end in shard_ranges(path, jobs * shards_per_job)]
+    paths, starts, ends = zip(*tasks)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        return list(pool.map(worker, paths, starts, ends))
+
+
+class ExactSum:
+    """Order-independent running sum: ints stay exact, floats keep Shewchuk partials.
+
+    Shard results can be merged in any grouping and still produce the same
+    correctly rounded total as a single pass.
+    """
+
+    __slots__ = ("integer", "partials")
+
+    def __init__(self) -> None:
+        self.integer = 0
+        self.partials: list[float] = []
+
+    def add(self, value: float) -> None:
+        if isinstance(value, int):
+            self.integer += value
+            return
+        partials = self.partials
+        index = 0
+        for other in partials:
+            if abs(value) < abs(other):
+                value, other = other, value
+            high = value + other
+            low = other - (high - value)
+            if low:
+                partials[index] = low
+                index += 1
+            value = high
+        partials[index:] = [value]
+
+    def merge(self, other: ExactSum) -> ExactSum:
+        self.integer += other.integer
+        for partial in other.partials:
+            self.add(partial)
+        return self
+
+    @property
+    def value(self) -> float:
+        if not self.partials:
+            return self.integer
+        return math.fsum([*self.partials, self.integer])
+
+    def exact(self) -> Fraction:
+        return sum(map(Fraction, self.partials), Fraction(self.integer))
+
+    def mean(self, count: int) -> float:
+        """Mean over ``count`` values with :func:`statistics.mean` rounding and result type."""
+        if count <= 0:
+            return 0
+        result = self.exact() / count
+        if not self.partials and result.denominator == 1:
+            return int(result)
+        return float(result)
+
+    def to_dict(self) -> dict:
+        return {"integer": self.integer, "partials": list(self.partials)}
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> ExactSum:
+        total = cls()
+        total.integer = int(payload.get("integer", 0))
+        total.partials = [float(value) for value in payload.get("partials", [])]
+        return total
@@ -0,0 +1,274 @@
+"""Hash join of ``JOURNAL.jsonl`` and ``SHADOW_JOURNAL.jsonl`` on ``mirror``.
+
+``join`` builds a hash table from the smaller journal (sealed segments
+included) and streams the other one past it, so both files are read once.
+The result says which main entries have no shadow (``unmatched``), which
+shadows point at no main entry (``orphaned``), how many distinct mirrors
+appear on both sides and, per facet, how many main entries are covered by
+a shadow.  Entries without a ``mirror`` (lines that are not JSON objects
+included) are counted but never match.  Unmatched and orphaned entries are
+counted exactly, but only the ``limit`` with the lowest line numbers are kept
+(``limit=None`` keeps all), so the report stays small however much is missing.
+
+The table is kept under ``memory_budget`` bytes (estimated per record).  When
+the build side outgrows it, the join turns into a Grace hash join: the rows
+seen so far, the rest of the build side and then the probe side are spilled
+by ``crc32(mirror)`` into partition files in a temporary directory and the
+partitions are joined one at a time.  A single mirror repeated more than the
+budget allows still ends up in one partition, which is then joined in
+memory regardless.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import tempfile
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import chain
+from pathlib import Path
+from typing import IO
+
+from common.journal_io import iter_jsonl, sealed_segments
+
+MEMORY_BUDGET = 64 << 20
+# Rough cost of one build row in the table: dict slot, list, tuple and ints.
+RECORD_BYTES = 160
+MAX_PARTITIONS = 256
+SAMPLE_LIMIT = 100
+
+Row = tuple[int, str, str]  # line_no, mirror, facet ("" for shadows)
+
+
+def journal_size(path: str | Path) -> int:
+    """Uncompressed bytes of a journal, sealed segments included."""
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    return size + sum(segment.size for segment in sealed_segments(path))
+
+
+def journal_rows(path: str | Path, *, main: bool) -> Iterator[Row]:
+    """``(line_no, mirror, facet)`` per entry; a line that is not an object has neither."""
+    for line_no, entry in iter_jsonl(path):
+        if not isinstance(entry, dict):
+            entry = {}
+        mirror = entry.get("mirror")
+        facet = entry.get("facet") if main else ""
+        yield (
+            line_no,
+            mirror if isinstance(mirror, str) else "",
+            facet if isinstance(facet, str) else "",
+        )
+
+
+class Sample:
+    """How many ``(line_no, mirror)`` pairs were added, keeping the ``limit`` lowest lines."""
+
+    def __init__(self, limit: int | None = SAMPLE_LIMIT) -> None:
+        self.limit = limit
+        self.count = 0
+        self._heap: list[tuple[int, str]] = []  # (-line_no, mirror): the highest line on top
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, line_no: int, mirror: str) -> None:
+        self.count += 1
+        self._keep(-line_no, mirror)
+
+    def _keep(self, key: int, mirror: str) -> None:
+        if self.limit is None or len(self._heap) < self.limit:
+            heapq.heappush(self._heap, (key, mirror))
+        elif self._heap and key > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (key, mirror))
+
+    def merge(self, other: Sample) -> None:
+        self.count += other.count
+        for key, mirror in other._heap:
+            self._keep(key, mirror)
+
+    def items(self) -> list[tuple[int, str]]:
+        """The kept pairs by line number."""
+        return sorted((-key, mirror) for key, mirror in self._heap)
+
+
+@dataclass
+class JoinReport:
+    limit: int | None = SAMPLE_LIMIT  # unmatched/orphaned pairs kept, beyond their counts
+    entries: int = 0
+    shadows: int = 0
+    matched: int = 0  # distinct mirrors present on both sides
+    unmatched: Sample = field(init=False)  # main (line_no, mirror)
+    orphaned: Sample = field(init=False)  # shadow (line_no, mirror)
+    facets: dict[str, list[int]] = field(default_factory=dict)  # facet -> [entries, covered]
+    partitions: int = 0  # 0 when the join fit in memory
+
+    def __post_init__(self) -> None:
+        self.unmatched = Sample(self.limit)
+        self.orphaned = Sample(self.limit)
+
+    def _count(self, facet: str, covered: bool) -> None:
+        counts = self.facets.setdefault(facet, [0, 0])
+        counts[0] += 1
+        counts[1] += covered
+
+    def merge(self, other: JoinReport) -> JoinReport:
+        self.entries += other.entries
+        self.shadows += other.shadows
+        self.matched += other.matched
+        self.unmatched.merge(other.unmatched)
+        self.orphaned.merge(other.orphaned)
+        for facet, (entries, covered) in other.facets.items():
+            counts = self.facets.setdefault(facet, [0, 0])
+            counts[0] += entries
+            counts[1] += covered
+        return self
+
+    def coverage(self) -> dict[str, float]:
+        """Share of each facet's main entries that have a shadow."""
+        return {
+            facet: round(covered / entries, 3)
+            for facet, (entries, covered) in sorted(self.facets.items())
+        }
+
+    def to_dict(self, limit: int | None = None) -> dict:
+        """JSON-ready summary listing at most ``limit`` unmatched and orphaned mirrors."""
+        return {
+            "entries": self.entries,
+            "shadows": self.shadows,
+            "matched_mirrors": self.matched,
+            "unmatched": len(self.unmatched),
+            "orphaned": len(self.orphaned),
+            "shadow_ratio": round(self.shadows / max(1, self.entries), 3),
+            "facet_coverage": self.coverage(),
+            "unmatched_mirrors": [
+                {"line": line_no, "mirror": mirror}
+                for line_no, mirror in self.unmatched.items()[:limit]
+            ],
+            "orphaned_mirrors": [
+                {"line": line_no, "mirror": mirror}
+                for line_no, mirror in self.orphaned.items()[:limit]
+            ],
+        }
+
+
+def _build(rows: Iterable[Row], *, main: bool) -> dict[str, list]:
+    table: dict[str, list] = {}
+    for line_no, mirror, facet in rows:
+        table.setdefault(mirror, []).append((line_no, facet) if main else line_no)
+    return table
+
+
+def _probe(
+    table: dict[str, list], rows: Iterable[Row], *, build_main: bool, limit: int | None
+) -> JoinReport:
+    report = JoinReport(limit)
+    matched: set[str] = set()
+    if build_main:
+        for line_no, mirror, _ in rows:
+            report.shadows += 1
+            if mirror and mirror in table:
+                matched.add(mirror)
+            else:
+                report.orphaned.add(line_no, mirror)
+        for mirror, entries in table.items():
+            covered = mirror in matched
+            for line_no, facet in entries:
+                report.entries += 1
+                report._count(facet, covered)
+                if not covered:
+                    report.unmatched.add(line_no, mirror)
+    else:
+        for line_no, mirror, facet in rows:
+            report.entries += 1
+            covered = bool(mirror) and mirror in table
+            report._count(facet, covered)
+            if covered:
+                matched.add(mirror)
+            else:
+                report.unmatched.add(line_no, mirror)
+        for mirror, shadows in table.items():
+            report.shadows += len(shadows)
+            if mirror not in matched:
+                for line_no in shadows:
+                    report.orphaned.add(line_no, mirror)
+    report.matched = len(matched)
+    return report
+
+
+class _Partitions:
+    """Rows spilled to ``count`` JSONL files by ``crc32(mirror)``."""
+
+    def __init__(self, directory: str, name: str, count: int) -> None:
+        self.paths = [Path(directory, f"{name}-{index:03d}.jsonl") for index in range(count)]
+
+    def write(self, rows: Iterable[Row]) -> None:
+        with ExitStack() as stack:
+            handles: dict[int, IO[str]] = {}
+            for row in rows:
+                index = zlib.crc32(row[1].encode("utf-8")) % len(self.paths)
+                handle = handles.get(index)
+                if handle is None:
+                    target = self.paths[index]
+                    handle = stack.enter_context(open(target, "w", encoding="utf-8"))
+                    handles[index] = handle
+                handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def rows(self, index: int) -> Iterator[Row]:
+        if not self.paths[index].exists():
+            return
+        with open(self.paths[index], encoding="utf-8") as handle:
+            for line in handle:
+                line_no, mirror, facet = json.loads(line)
+                yield line_no, mirror, facet
+
+
+def join(
+    main: str | Path,
+    shadow: str | Path,
+    memory_budget: int = MEMORY_BUDGET,
+    limit: int | None = SAMPLE_LIMIT,
+) -> JoinReport:
+    """Join ``main`` and ``shadow`` on ``mirror`` in one pass over each journal."""
+    build_main = journal_size(main) <= journal_size(shadow)
+    build_path, probe_path = (main, shadow) if build_main else (shadow, main)
+    build = journal_rows(build_path, main=build_main)
+    seen: list[Row] = []
+    used = 0
+    for row in build:
+        seen.append(row)
+        used += RECORD_BYTES + len(row[1]) + len(row[2])
+        if used > memory_budget:
+            return _grace_join(
+                chain(seen, build), build_path, probe_path, build_main, memory_budget, limit
+            )
+    table = _build(seen, main=build_main)
+    del seen
+    probe = journal_rows(probe_path, main=not build_main)
+    return _probe(table, probe, build_main=build_main, limit=limit)
+
+
+def _grace_join(
+    build: Iterable[Row],
+    build_path: str | Path,
+    probe_path: str | Path,
+    build_main: bool,
+    memory_budget: int,
+    limit: int | None,
+) -> JoinReport:
+    # Source lines are longer than table rows, so this leaves headroom per partition.
+    count = min(MAX_PARTITIONS, max(2, math.ceil(2 * journal_size(build_path) / memory_budget)))
+    report = JoinReport(limit, partitions=count)
+    with tempfile.TemporaryDirectory(prefix="journal-join-") as directory:
+        built = _Partitions(directory, "build", count)
+        built.write(build)
+        probed = _Partitions(directory, "probe", count)
+        probed.write(journal_rows(probe_path, main=not build_main))
+        for index in range(count):
+            table = _build(built.rows(index), main=build_main)
+            report.merge(_probe(table, probed.rows(index), build_main=build_main, limit=limit))
+    return report
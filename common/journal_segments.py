@@ -0,0 +1,278 @@
+"""Rotation of append-only journals into sealed, compressed segments.
+
+``seal`` moves every complete line of ``JOURNAL.jsonl`` into the next segment
+``JOURNAL.jsonl.segments/NNNNNN.jsonl[.gz|.zst]`` and leaves the journal file
+with only a trailing partial line (usually nothing), so writers keep appending
+to the same path.  The manifest next to the segments records, per segment,
+the raw line count, entry count, uncompressed size and exact metric sums and
+facets (see :func:`common.journal_checkpoint.summarize`); readers in
+:mod:`common.journal_io` and :mod:`common.journal_checkpoint` use it to read
+segmented journals transparently and to aggregate without decompressing.
+
+Sealing runs under the same exclusive ``flock`` ``JournalWriter`` takes for
+each flush.  The new segment is first recorded as ``pending`` (ignored by
+readers), the journal file is then cut and the flag cleared; ``recover``
+finishes a seal interrupted between those steps, so no line is ever counted
+twice.  The cut writes the remainder to a temporary file that replaces the
+journal atomically, so readers never see a half-rewritten journal; lock holders
+notice the replaced inode and reopen the path.  Appends that bypass the lock (plain ``open(..., "a")``) should not
+run while a journal is being sealed.
+
+Compression is ``gzip`` (default), ``zstd`` (needs the optional
+``zstandard`` package) or ``none``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from common.journal_checkpoint import summarize
+from common.journal_io import (
+    BLOCK_SIZE,
+    MANIFEST_NAME,
+    Segment,
+    read_manifest,
+    sealed_segments,
+    segment_dir,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
+
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+
+@dataclass
+class RotationPolicy:
+    """Seal the journal once it reaches ``max_bytes`` or ``max_age`` seconds since the last seal."""
+
+    max_bytes: int | None = 64 << 20
+    max_age: float | None = None
+    compression: str = "gzip"
+
+    def __post_init__(self) -> None:
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {sorted(COMPRESSIONS)}")
+
+    def due(self, path: str | Path, now: float | None = None) -> bool:
+        """Whether ``path`` should be sealed now; only reads the journal and its manifest.
+
+        The age of a journal that was never sealed counts from the first
+        ``maybe_rotate`` that saw it non-empty, so until then it is not due by age.
+        """
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if self.max_bytes is not None and size >= self.max_bytes:
+            return True
+        if self.max_age is not None:
+            since = read_manifest(path).get("active_since")
+            if since is None:
+                return False
+            return (time.time() if now is None else now) - since >= self.max_age
+        return False
+
+    def maybe_rotate(self, path: str | Path, now: float | None = None) -> Segment | None:
+        if self.due(path, now):
+            return seal(path, self.compression, now)
+        if (
+            self.max_age is not None
+            and os.path.exists(path)
+            and os.path.getsize(path)
+            and read_manifest(path).get("active_since") is None
+        ):
+            _update_manifest(path, active_since=time.time() if now is None else now)
+        return None
+
+
+def _write_manifest(path: str | Path, manifest: dict) -> None:
+    target = segment_dir(path) / MANIFEST_NAME
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, target)
+
+
+def _update_manifest(path: str | Path, **fields: object) -> None:
+    segment_dir(path).mkdir(exist_ok=True)
+    manifest = read_manifest(path)
+    manifest.update(fields)
+    _write_manifest(path, manifest)
+
+
+@dataclass
+class _Journal:
+    """The locked journal; ``_cut`` swaps ``handle`` for the file that replaced it."""
+
+    path: Path
+    handle: BinaryIO
+
+
+def _flock(handle: BinaryIO) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+
+
+def _open_locked(path: Path) -> BinaryIO:
+    """Open and lock ``path``, retrying if a concurrent cut replaced it while we waited."""
+    while True:
+        handle = open(path, "r+b")  # noqa: SIM115 - returned locked to the caller
+        _flock(handle)
+        if os.fstat(handle.fileno()).st_ino == os.stat(path).st_ino:
+            return handle
+        handle.close()
+
+
+@contextmanager
+def _locked(path: str | Path) -> Iterator[_Journal]:
+    journal = _Journal(Path(path), _open_locked(Path(path)))
+    try:
+        yield journal
+    finally:
+        journal.handle.close()  # closing the descriptor releases its flock
+
+
+def _complete_bytes(handle: BinaryIO) -> int:
+    """Length of the prefix ending with the last newline."""
+    end = handle.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        step = min(BLOCK_SIZE, position)
+        position -= step
+        handle.seek(position)
+        index = handle.read(step).rfind(b"\n")
+        if index >= 0:
+            return position + index + 1
+    return 0
+
+
+def _iter_prefix(handle: BinaryIO, size: int) -> Iterator[bytes]:
+    handle.seek(0)
+    remaining = size
+    for line in handle:
+        if remaining <= 0:
+            break
+        yield line
+        remaining -= len(line)
+
+
+def _open_writer(path: Path, compression: str) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.GzipFile(path, "wb", compresslevel=6, mtime=0)  # type: ignore[return-value]
+    if compression == "zstd":
+        import zstandard  # optional: only needed for zstd-compressed segments
+
+        return zstandard.ZstdCompressor(level=9).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def _cut(journal: _Journal, size: int) -> None:
+    """Drop the first ``size`` bytes, keeping whatever was appended after them.
+
+    The remainder goes to a locked temporary file that then replaces the journal,
+    so a crash leaves either the old or the new file, never a mix of both.
+    """
+    tmp = journal.path.with_name(f".{journal.path.name}.cut.tmp")
+    replacement = open(tmp, "w+b")  # noqa: SIM115 - becomes the locked journal handle
+    try:
+        _flock(replacement)
+        shutil.copymode(journal.path, tmp)
+        journal.handle.seek(size)
+        shutil.copyfileobj(journal.handle, replacement, BLOCK_SIZE)
+        replacement.flush()
+        os.fsync(replacement.fileno())
+        os.replace(tmp, journal.path)
+    except BaseException:
+        replacement.close()
+        raise
+    journal.handle.close()
+    journal.handle = replacement
+
+
+def _prefix_sha256(handle: BinaryIO, size: int) -> str:
+    digest = hashlib.sha256()
+    for line in _iter_prefix(handle, size):
+        digest.update(line)
+    return digest.hexdigest()
+
+
+def recover(path: str | Path) -> None:
+    """Finish a seal that was interrupted after its segment was recorded as pending."""
+    with _locked(path) as journal:
+        _recover_locked(journal)
+
+
+def _recover_locked(journal: _Journal) -> None:
+    manifest = read_manifest(journal.path)
+    pending = [item for item in manifest["segments"] if item.get("pending")]
+    if not pending:
+        return
+    item = pending[-1]
+    size = journal.handle.seek(0, os.SEEK_END)
+    if size >= item["bytes"] and _prefix_sha256(journal.handle, item["bytes"]) == item["sha256"]:
+        _cut(journal, item["bytes"])
+    item.pop("pending")
+    _write_manifest(journal.path, manifest)
+
+
+def seal(path: str | Path, compression: str = "gzip", now: float | None = None) -> Segment | None:
+    """Move the complete lines of ``path`` into a new sealed segment; ``None`` if there are none."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {sorted(COMPRESSIONS)}")
+    path = Path(path)
+    directory = segment_dir(path)
+    directory.mkdir(exist_ok=True)
+    with _locked(path) as journal:
+        _recover_locked(journal)
+        handle = journal.handle
+        size = _complete_bytes(handle)
+        if size == 0:
+            return None
+        manifest = read_manifest(path)
+        name = f"{len(manifest['segments']) + 1:06d}.jsonl{COMPRESSIONS[compression]}"
+        target = directory / name
+        tmp = directory / f".{name}.tmp"
+        digest = hashlib.sha256()
+        with _open_writer(tmp, compression) as out:
+            for line in _iter_prefix(handle, size):
+                digest.update(line)
+                out.write(line)
+        with open(tmp, "rb") as written:
+            os.fsync(written.fileno())
+        os.replace(tmp, target)
+        lines, summary = summarize(path, _iter_prefix(handle, size))
+
+        item = {
+            "file": name,
+            "lines": lines,
+            "entries": summary["count"],
+            "bytes": size,
+            "sha256": digest.hexdigest(),
+            "compression": compression,
+            "summary": summary,
+            "pending": True,
+        }
+        manifest["segments"].append(item)
+        _write_manifest(path, manifest)
+        _cut(journal, size)
+        item.pop("pending")
+        manifest["active_since"] = time.time() if now is None else now
+        _write_manifest(path, manifest)
+    return sealed_segments(path)[-1]
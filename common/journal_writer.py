@@ -0,0 +1,161 @@
+"""Long-lived buffered writer for append-only JSONL journals.
+
+Entries are serialized on ``write()`` and kept in memory until the buffer
+reaches ``max_entries``/``max_bytes`` or ``flush_interval`` seconds pass.  Each
+flush is a single ``write()`` on an ``O_APPEND`` descriptor taken under an
+exclusive ``flock`` so several threads and processes can share one journal
+without interleaving lines.
+
+Durability levels:
+
+* ``"none"``  – rely on the OS page cache, never ``fsync``;
+* ``"batch"`` – ``fsync`` once per flushed batch;
+* ``"entry"`` – flush and ``fsync`` after every entry.
+
+With a ``rotation`` policy (see :mod:`common.journal_segments`) the journal is
+sealed into a compressed segment after a flush once the policy is due.  A seal
+replaces the journal file, so each flush reopens the path if its inode changed.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+    from common.journal_segments import RotationPolicy
+
+DURABILITY = ("none", "batch", "entry")
+
+
+class JournalWriter:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        max_entries: int = 256,
+        max_bytes: int = 1 << 20,
+        flush_interval: float | None = 1.0,
+        durability: str = "batch",
+        rotation: RotationPolicy | None = None,
+    ) -> None:
+        if durability not in DURABILITY:
+            raise ValueError(f"durability must be one of {DURABILITY}, got {durability!r}")
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.rotation = rotation
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._fd = self._open()
+        self._flusher: threading.Thread | None = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def write(self, entry: dict) -> None:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self.closed:
+                raise ValueError("write to closed JournalWriter")
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if (
+                self.durability == "entry"
+                or len(self._buffer) >= self.max_entries
+                or self._buffered_bytes >= self.max_bytes
+                or self._interval_elapsed()
+            ):
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self._flush_locked()
+            self._closed.set()
+            os.close(self._fd)
+        atexit.unregister(self.close)
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+
+    def _open(self) -> int:
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _lock_current(self) -> None:
+        """Take the ``flock``, first reopening the path if a seal replaced the file."""
+        while True:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if os.fstat(self._fd).st_ino == current:
+                return
+            os.close(self._fd)  # also releases the flock on the replaced file
+            self._fd = self._open()
+
+    def _interval_elapsed(self) -> bool:
+        return bool(self.flush_interval) and (
+            time.monotonic() - self._last_flush >= (self.flush_interval or 0)
+        )
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        payload = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._lock_current()
+        try:
+            view = memoryview(payload)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+            if self.durability != "none":
+                os.fsync(self._fd)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if self.rotation is not None:
+            self.rotation.maybe_rotate(self.path)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if not self.closed and self._interval_elapsed():
+                    self._flush_locked()
@@ -0,0 +1,148 @@
+"""Dictionary persisted as a JSON snapshot plus an append-only operation log.
+
+Updates are appended to ``<path>.log`` as one JSONL line per batch
+(``{"set": {...}}`` or ``{"del": [...]}``) through a ``JournalWriter``, so an
+insert costs one short append instead of rewriting the whole file.  Once
+``compact_every`` keys have been logged the dictionary is written to a
+temporary file, fsynced and renamed over ``<path>`` and the log is truncated.
+Replaying the log on top of either snapshot gives the same result, so a crash
+at any point loses at most the unflushed tail.  Only damage a crash can cause
+is repaired on load: an incomplete last log line is dropped.  A snapshot that
+does not parse, or a bad log line with more log after it, raises
+``JournalDecodeError`` instead of silently losing data.
+
+With ``write_behind`` appends are buffered and flushed every
+``flush_interval`` seconds (and on ``flush``/``close``) instead of per call.
+``durability`` is the log writer's (see ``JournalWriter``): ``"batch"`` fsyncs
+once per flushed batch, i.e. per call unless ``write_behind`` groups them,
+``"entry"`` after every op and ``"none"`` leaves it to the OS.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from common.journal_io import JournalDecodeError
+from common.journal_writer import JournalWriter
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+def write_json_atomic(path: str | Path, payload: object, **dump_options: Any) -> None:
+    """Write ``payload`` to a sibling temp file, fsync it and rename it over ``path``."""
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False, **dump_options)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, path)
+
+
+class OpLogStore:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        compact_every: int = 10_000,
+        write_behind: bool = False,
+        flush_interval: float = 1.0,
+        durability: str = "batch",
+        indent: int | None = 2,
+    ) -> None:
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.name + ".log")
+        self.compact_every = compact_every
+        self.indent = indent
+        self.data: dict[str, Any] = {}
+        self.pending = 0
+        self._load()
+        self._writer = self._open_writer(write_behind, flush_interval, durability)
+
+    def _open_writer(
+        self, write_behind: bool, flush_interval: float, durability: str
+    ) -> JournalWriter:
+        if write_behind:
+            return JournalWriter(
+                self.log_path, flush_interval=flush_interval, durability=durability
+            )
+        return JournalWriter(
+            self.log_path, max_entries=1, flush_interval=None, durability=durability
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                self.data = json.load(handle)
+        except FileNotFoundError:
+            self.data = {}
+        except json.JSONDecodeError as exc:
+            # Snapshots are replaced atomically, so a crash cannot leave one half-written.
+            raise JournalDecodeError(self.path, exc.lineno, exc) from exc
+        try:
+            with open(self.log_path, "rb") as handle:
+                good = 0
+                for line_no, line in enumerate(handle, 1):
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        if handle.read(1):
+                            raise JournalDecodeError(self.log_path, line_no, exc) from exc
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply(op)
+                    good += len(line)
+                torn = handle.seek(0, os.SEEK_END) != good
+        except FileNotFoundError:
+            return
+        if torn:
+            # Drop the tail of an interrupted append so new lines follow a good one.
+            os.truncate(self.log_path, good)
+
+    def _apply(self, op: dict) -> None:
+        changed = op.get("set", {})
+        self.data.update(changed)
+        removed = op.get("del", [])
+        for key in removed:
+            self.data.pop(key, None)
+        self.pending += len(changed) + len(removed)
+
+    def update(self, items: Mapping[str, Any]) -> None:
+        if items:
+            self._log({"set": dict(items)})
+
+    def delete(self, keys: Iterable[str]) -> None:
+        removed = [key for key in keys if key in self.data]
+        if removed:
+            self._log({"del": removed})
+
+    def _log(self, op: dict) -> None:
+        self._writer.write(op)
+        self._apply(op)
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def compact(self) -> None:
+        """Fold the log into a new snapshot and truncate it."""
+        self._writer.flush()
+        write_json_atomic(self.path, self.data, indent=self.indent)
+        os.truncate(self.log_path, 0)
+        self.pending = 0
+
+    def close(self) -> None:
+        self._writer.close()
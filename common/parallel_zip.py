@@ -0,0 +1,157 @@
+"""Zip archives whose members are streamed, with their chunks produced concurrently.
+
+Every member is a factory of byte chunks (a file read in blocks, or entries
+rendered on the fly).  Worker threads run the factories of the next ``jobs``
+members ahead of time, each into a queue of at most ``QUEUE_CHUNKS`` chunks,
+while a single writer adds the members in submission order through the
+public ``ZipFile.open(info, "w")`` API.  Reading and rendering therefore
+overlap compression (``zlib`` and ``bz2`` release the GIL), and memory stays
+bounded by ``jobs * QUEUE_CHUNKS`` chunks whatever the input size.
+
+The compression method and level are chosen from the member's suffix:
+already-compressed formats are stored, small text documents get the highest
+deflate level and bulky journals and logs a faster one.
+"""
+
+from __future__ import annotations
+
+import time
+import zipfile
+import zlib
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Full, Queue
+from threading import Event
+from typing import NamedTuple
+
+CHUNK_SIZE = 1 << 20
+QUEUE_CHUNKS = 4
+# Already-compressed formats gain nothing from deflate and are stored as-is.
+COMPRESSED_SUFFIXES = frozenset(
+    {".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".whl", ".jar", ".png", ".jpg", ".jpeg"}
+    | {".gif", ".webp", ".pdf", ".mp3", ".mp4", ".woff", ".woff2"}
+)
+TEXT_SUFFIXES = frozenset({".md", ".txt", ".json", ".yaml", ".yml", ".csv", ".py", ".html"})
+BULK_SUFFIXES = frozenset({".jsonl", ".log"})
+
+Chunks = Callable[[], Iterable[bytes]]
+_DONE = object()
+
+
+class Member(NamedTuple):
+    info: zipfile.ZipInfo
+    chunks: Chunks
+    level: int | None
+
+
+def compression_for(name: str) -> tuple[int, int | None]:
+    """``(compress_type, compresslevel)`` for an archive member name."""
+    suffix = Path(name).suffix.lower()
+    if suffix in COMPRESSED_SUFFIXES:
+        return zipfile.ZIP_STORED, None
+    if suffix in TEXT_SUFFIXES:
+        return zipfile.ZIP_DEFLATED, 9
+    if suffix in BULK_SUFFIXES:
+        return zipfile.ZIP_DEFLATED, 6
+    return zipfile.ZIP_DEFLATED, zlib.Z_DEFAULT_COMPRESSION
+
+
+def file_chunks(path: str | Path) -> Iterator[bytes]:
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            yield chunk
+
+
+def _member(info: zipfile.ZipInfo, chunks: Chunks) -> Member:
+    info.compress_type, level = compression_for(info.filename)
+    return Member(info, chunks, level)
+
+
+def file_member(path: str | Path, arcname: str) -> Member:
+    """Member copying ``path`` with its mtime and mode, like ``ZipFile.write``.
+
+    A directory becomes an empty stored ``arcname/`` entry, as ``ZipFile.write`` does.
+    """
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    if info.is_dir():
+        info.compress_type = zipfile.ZIP_STORED
+        return Member(info, lambda: (), None)
+    return _member(info, lambda: file_chunks(path))
+
+
+def stream_member(arcname: str, chunks: Chunks) -> Member:
+    """Member generated from ``chunks`` and timestamped now."""
+    info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+    info.external_attr = 0o644 << 16
+    return _member(info, chunks)
+
+
+def _set_level(info: zipfile.ZipInfo, level: int | None) -> None:
+    # ``ZipInfo.compress_level`` is public from Python 3.13; earlier versions
+    # read the same setting from ``_compresslevel`` when a member is opened.
+    if hasattr(info, "compress_level"):
+        info.compress_level = level
+    else:
+        info._compresslevel = level  # type: ignore[attr-defined]
+
+
+def _put(out: Queue, item: object, stop: Event) -> bool:
+    """Block until ``item`` is queued; ``False`` when the writer gave up meanwhile."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _produce(chunks: Chunks, out: Queue, stop: Event) -> None:
+    try:
+        for chunk in chunks():
+            if not _put(out, chunk, stop):
+                return
+    except BaseException as exc:  # noqa: BLE001 - re-raised by the writer
+        _put(out, exc, stop)
+        return
+    _put(out, _DONE, stop)
+
+
+def _write_member(archive: zipfile.ZipFile, member: Member, out: Queue) -> None:
+    info, _, level = member
+    if info.is_dir():
+        archive.writestr(info, b"")
+        return
+    _set_level(info, level)
+    # A streamed member's size is unknown up front, so allow it to exceed 4 GiB.
+    with archive.open(info, "w", force_zip64=not info.file_size) as dest:
+        while (chunk := out.get()) is not _DONE:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            dest.write(chunk)
+
+
+def write_zip(path: str | Path, members: Iterable[Member], jobs: int = 4) -> None:
+    """Write ``members`` to ``path`` in order, producing up to ``jobs`` of them ahead."""
+    jobs = max(1, jobs)
+    stop = Event()
+    with zipfile.ZipFile(path, "w") as archive, ThreadPoolExecutor(jobs) as pool:
+        pending: deque[tuple[Member, Queue]] = deque()
+
+        def drain(limit: int) -> None:
+            while len(pending) > limit:
+                _write_member(archive, *pending.popleft())
+
+        try:
+            for member in members:
+                out: Queue = Queue(QUEUE_CHUNKS)
+                if not member.info.is_dir():
+                    pool.submit(_produce, member.chunks, out, stop)
+                pending.append((member, out))
+                drain(jobs)
+            drain(0)
+        except BaseException:
+            stop.set()
+            raise
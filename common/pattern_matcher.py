@@ -0,0 +1,98 @@
+"""Aho-Corasick multi-pattern matcher shared by the guard layers.
+
+The automaton is compiled once from every rule source and scans a message in a
+single pass, so the cost per character does not depend on how many rules are
+loaded.  Matching is case-insensitive in the same way as the original
+``phrase in text.lower()`` checks: both patterns and text go through
+``str.lower()`` and positions refer to the lowercased text.  With
+``case_sensitive=True`` patterns and text are matched as written, like a
+plain ``phrase in text``.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    pattern: str
+
+
+def load_rules(path: str | Path) -> list[str]:
+    """Read one pattern per line, skipping blanks and ``#`` comments."""
+    rules: list[str] = []
+    try:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                rule = line.strip()
+                if rule and not rule.startswith("#"):
+                    rules.append(rule)
+    except FileNotFoundError:
+        return []
+    return rules
+
+
+class PatternMatcher:
+    def __init__(self, patterns: Iterable[str], case_sensitive: bool = False) -> None:
+        self.case_sensitive = case_sensitive
+        fold = (lambda p: p) if case_sensitive else str.lower
+        self.patterns: tuple[str, ...] = tuple(dict.fromkeys(fold(p) for p in patterns if p))
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (index,)
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """Yield every (possibly overlapping) match ordered by end position."""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        text = text or ""
+        for pos, char in enumerate(text if self.case_sensitive else text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                pattern = patterns[index]
+                yield Match(pos + 1 - len(pattern), pos + 1, pattern)
+
+    def search(self, text: str) -> Match | None:
+        """Return the first match to complete, or ``None``."""
+        return next(self.finditer(text), None)
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+    def matched(self, text: str) -> set[str]:
+        return {match.pattern for match in self.finditer(text)}
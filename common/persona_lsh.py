@@ -0,0 +1,161 @@
+"""MinHash signatures and an LSH index for approximate nearest-persona lookup.
+
+A ``MinHasher`` turns a concept set into ``num_perm`` minimum hash values; the
+fraction of equal positions between two signatures estimates their Jaccard
+similarity.  ``LSHIndex`` splits signatures into ``bands`` of ``rows`` values
+and buckets personas per band, so a query only looks at personas sharing at
+least one whole band.  More bands (fewer rows each) find more candidates at a
+higher cost; the similarity at which a pair becomes likely to collide is
+roughly ``(1 / bands) ** (1 / rows)``.  Candidates are re-ranked with the
+exact Jaccard distance of ``ConceptSet.distance`` unless ``exact=False``.
+
+Concepts are hashed with BLAKE2b rather than ``hash()`` so signatures are
+stable across processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import random
+from collections.abc import Iterable, Sequence
+
+from common.persona_protocol import PersonaSpec
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None  # type: ignore[assignment]
+
+# Coefficients are below p = 2**31 - 1 and concept hashes below 2**32, so
+# a * h + b fits in an unsigned 64-bit integer and NumPy matches pure Python.
+MERSENNE_PRIME = (1 << 31) - 1
+EMPTY = MERSENNE_PRIME
+
+Signature = tuple[int, ...]
+
+
+def concept_hash(concept: str) -> int:
+    return int.from_bytes(hashlib.blake2b(concept.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+class MinHasher:
+    """``num_perm`` universal hash functions ``(a * h + b) mod p`` from a fixed seed."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1) -> None:
+        if num_perm < 1:
+            raise ValueError("num_perm must be positive")
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)]
+        self.b = [rng.randrange(MERSENNE_PRIME) for _ in range(num_perm)]
+        if np is not None:
+            self._a = np.asarray(self.a, dtype=np.uint64)[:, None]
+            self._b = np.asarray(self.b, dtype=np.uint64)[:, None]
+
+    def signature(self, concepts: Iterable[str]) -> Signature:
+        hashes = [concept_hash(concept) for concept in set(concepts)]
+        if not hashes:
+            return (EMPTY,) * self.num_perm
+        if np is not None:
+            values = np.asarray(hashes, dtype=np.uint64)[None, :]
+            minimums = ((self._a * values + self._b) % np.uint64(MERSENNE_PRIME)).min(axis=1)
+            return tuple(minimums.tolist())
+        return tuple(
+            min((a * value + b) % MERSENNE_PRIME for value in hashes)
+            for a, b in zip(self.a, self.b)
+        )
+
+
+def estimate_distance(left: Signature, right: Signature) -> float:
+    equal = sum(x == y for x, y in zip(left, right))
+    return 1 - equal / len(left)
+
+
+def jaccard_distance(left: frozenset[str], right: frozenset[str]) -> float:
+    union = len(left | right)
+    return 0.0 if union == 0 else 1 - len(left & right) / union
+
+
+class LSHIndex:
+    """Banded MinHash index of concept sets keyed by persona name."""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1) -> None:
+        if bands < 1 or num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: list[dict[Signature, set[str]]] = [{} for _ in range(bands)]
+        self.entries: dict[str, tuple[frozenset[str], Signature]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.entries
+
+    @property
+    def threshold(self) -> float:
+        """Similarity at which a pair collides in some band with probability ~1/2."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def _bands(self, signature: Signature) -> Iterable[tuple[int, Signature]]:
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows : (band + 1) * rows]
+
+    def insert(self, key: str, concepts: Iterable[str]) -> None:
+        """Add ``key`` or replace its concepts."""
+        if key in self.entries:
+            self.remove(key)
+        items = frozenset(concepts)
+        signature = self.hasher.signature(items)
+        self.entries[key] = (items, signature)
+        for band, chunk in self._bands(signature):
+            self.buckets[band].setdefault(chunk, set()).add(key)
+
+    def insert_persona(self, persona: PersonaSpec) -> None:
+        self.insert(persona.name, persona.concepts.items)
+
+    def remove(self, key: str) -> None:
+        _, signature = self.entries.pop(key)
+        for band, chunk in self._bands(signature):
+            bucket = self.buckets[band][chunk]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[band][chunk]
+
+    def candidates(self, signature: Signature) -> set[str]:
+        found: set[str] = set()
+        for band, chunk in self._bands(signature):
+            found.update(self.buckets[band].get(chunk, ()))
+        return found
+
+    def query(
+        self, concepts: Iterable[str], k: int = 1, exact: bool = True
+    ) -> list[tuple[str, float]]:
+        """Approximate ``k`` nearest keys as ``(key, distance)``, closest first.
+
+        With ``exact`` the candidates are re-ranked by their true Jaccard
+        distance; otherwise the MinHash estimate is returned.  Personas that
+        share no band with the query are never returned.
+        """
+        items = frozenset(concepts)
+        signature = self.hasher.signature(items)
+        scored = []
+        for key in self.candidates(signature):
+            stored, stored_signature = self.entries[key]
+            if exact:
+                distance = jaccard_distance(items, stored)
+            else:
+                distance = estimate_distance(signature, stored_signature)
+            scored.append((distance, key))
+        return [(key, distance) for distance, key in heapq.nsmallest(k, scored)]
+
+    @classmethod
+    def from_personas(cls, personas: Sequence[PersonaSpec], **options: int) -> LSHIndex:
+        index = cls(**options)
+        for persona in personas:
+            index.insert_persona(persona)
+        return index
@@ -1,20 +1,151 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from common.persona_lsh import MinHasher, Signature
 
 
 class ConceptSet:
     def __init__(self, items: Iterable[str] | None) -> None:
         self.items = set(items or [])
 
-    def distance(self, other: "ConceptSet") -> float:
+    def distance(self, other: ConceptSet) -> float:
         union = len(self.items | other.items)
         intersection = len(self.items & other.items)
         return 0.0 if union == 0 else 1 - intersection / union
 
+    def minhash(self, hasher: MinHasher) -> Signature:
+        """MinHash signature for ``common.persona_lsh`` approximate lookups."""
+        return hasher.signature(self.items)
+
 
 class PersonaSpec:
     def __init__(self, name: str, concepts: Iterable[str], traits: dict | None = None) -> None:
         self.name = name
         self.concepts = ConceptSet(concepts)
         self.traits = traits or {}
+
+
+class ConceptIndex:
+    """Batched Jaccard distances over many concept sets.
+
+    Concepts are interned to integer ids and each set is kept as an integer
+    bitset, so a pair costs one popcount instead of two set allocations.  With
+    NumPy the bitsets are also packed into a ``uint64`` matrix (one bit per
+    concept), a one-to-many query is a single vectorised AND + popcount and
+    the full matrix is computed in row blocks of at most ``BLOCK_BYTES``.
+    Query concepts that no indexed set contains are counted, not interned.
+    Every value is identical to the corresponding ``ConceptSet.distance``.
+    """
+
+    BLOCK_BYTES = 4 << 20
+
+    def __init__(self, sets: Iterable[Iterable[str]] = ()) -> None:
+        self.ids: dict[str, int] = {}
+        self.bitsets: list[int] = []
+        self.sizes: list[int] = []
+        self._packed: np.ndarray | None = None
+        for concepts in sets:
+            self.add(concepts)
+
+    def __len__(self) -> int:
+        return len(self.bitsets)
+
+    def intern(self, concepts: Iterable[str]) -> list[int]:
+        ids = self.ids
+        return [ids.setdefault(concept, len(ids)) for concept in set(concepts)]
+
+    def add(self, concepts: Iterable[str]) -> int:
+        """Index one concept set and return its row number."""
+        columns = self.intern(concepts)
+        self.bitsets.append(_bitset(columns))
+        self.sizes.append(len(columns))
+        self._packed = None
+        return len(self.bitsets) - 1
+
+    def distances(self, concepts: Iterable[str]) -> list[float]:
+        """Distances from ``concepts`` to every indexed set, in row order."""
+        unique = set(concepts)
+        query = _bitset(self.ids[concept] for concept in unique if concept in self.ids)
+        if np is None or not self.bitsets:
+            return self._distances(query, len(unique))
+        packed = self.packed()
+        row = np.frombuffer(query.to_bytes(8 * packed.shape[1], "little"), dtype="<u8")
+        intersection = _popcount(packed & row).sum(axis=1, dtype=np.int64)
+        return _jaccard(intersection, len(unique), self._sizes()).tolist()
+
+    def packed(self) -> np.ndarray:
+        """The bitsets as an ``(n, ceil(concepts / 64))`` little-endian ``uint64`` matrix."""
+        if self._packed is None:
+            width = max(1, (len(self.ids) + 63) // 64)
+            data = b"".join(bits.to_bytes(8 * width, "little") for bits in self.bitsets)
+            self._packed = np.frombuffer(data, dtype="<u8").reshape(len(self), width)
+        return self._packed
+
+    def matrix(self) -> list[list[float]]:
+        """Full pairwise distance matrix between the indexed sets."""
+        if np is None or not self.bitsets:
+            return [self._distances(bits, size) for bits, size in zip(self.bitsets, self.sizes)]
+        packed, sizes = self.packed(), self._sizes()
+        step = max(1, self.BLOCK_BYTES // packed.nbytes)
+        rows = []
+        for start in range(0, len(self), step):
+            block = packed[start : start + step, None, :] & packed[None, :, :]
+            intersection = _popcount(block).sum(axis=2, dtype=np.int64)
+            rows.append(_jaccard(intersection, sizes[start : start + step, None], sizes[None, :]))
+        return np.concatenate(rows).tolist()
+
+    def _sizes(self) -> np.ndarray:
+        return np.asarray(self.sizes, dtype=np.int64)
+
+    def _distances(self, query: int, size: int) -> list[float]:
+        result = []
+        for bits, other in zip(self.bitsets, self.sizes):
+            intersection = (query & bits).bit_count()
+            union = size + other - intersection
+            result.append(0.0 if union == 0 else 1 - intersection / union)
+        return result
+
+
+def _jaccard(intersection: np.ndarray, size: int | np.ndarray, other: np.ndarray) -> np.ndarray:
+    # Counts are integers, so float64 division rounds exactly like Python's
+    # ``int / int`` in ``ConceptSet.distance``.
+    union = size + other - intersection
+    empty = union == 0
+    distance = 1 - intersection / np.where(empty, 1, union)
+    distance[empty] = 0.0
+    return distance
+
+
+def _bitset(columns: Iterable[int]) -> int:
+    bits = 0
+    for column in columns:
+        bits |= 1 << column
+    return bits
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per ``uint64`` word (``np.bitwise_count`` needs NumPy 2.0)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1)
+
+
+_BYTE_POPCOUNT = None if np is None else np.array([n.bit_count() for n in range(256)], np.uint8)
+
+
+def distance_matrix(sets: Sequence[ConceptSet]) -> list[list[float]]:
+    """``distance_matrix(sets)[i][j] == sets[i].distance(sets[j])``."""
+    return ConceptIndex(concepts.items for concepts in sets).matrix()
+
+
+def distances(query: ConceptSet, sets: Sequence[ConceptSet]) -> list[float]:
+    """``distances(query, sets)[i] == query.distance(sets[i])``."""
+    return ConceptIndex(concepts.items for concepts in sets).distances(query.items)
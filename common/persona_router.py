@@ -0,0 +1,84 @@
+"""Keyword routing of queries to personas.
+
+``PersonaRouter`` compiles the concepts of every ``PersonaSpec`` into one
+``PatternMatcher`` automaton, so a query is scored against all personas in a
+single pass whatever their number.  A persona scores one point per distinct
+concept found in the query; the highest score wins, ties go to the persona
+listed first, and a query matching nothing goes to the default persona.
+Concepts match case-insensitively unless ``case_sensitive`` is set.  Routes
+are memoized in an LRU cache.
+
+The persona graph (``GRAPH.json``: ``{"nodes": [...], "edges": [[a, b], ...],
+"concepts": {persona: [...]}}``) is loaded once; every routed persona must be
+one of its nodes, ``neighbours`` exposes the hand-off edges and
+``graph_personas`` builds the specs from ``concepts``.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+from common.pattern_matcher import PatternMatcher
+from common.persona_protocol import PersonaSpec
+
+
+def load_graph(path: str | Path) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def graph_personas(graph: dict) -> list[PersonaSpec]:
+    """A ``PersonaSpec`` per entry of the graph's ``concepts``, in the order listed."""
+    return [PersonaSpec(name, items) for name, items in graph.get("concepts", {}).items()]
+
+
+class PersonaRouter:
+    def __init__(
+        self,
+        personas: Iterable[PersonaSpec],
+        default: str,
+        graph: dict | None = None,
+        cache_size: int = 1024,
+        case_sensitive: bool = False,
+    ) -> None:
+        self.personas = {persona.name: persona for persona in personas}
+        self.default = default
+        nodes = list((graph or {}).get("nodes", [])) or [*self.personas, default]
+        unknown = {*self.personas, default} - set(nodes)
+        if unknown:
+            raise ValueError(f"personas missing from graph: {sorted(unknown)}")
+        self.edges: dict[str, list[str]] = {node: [] for node in nodes}
+        for source, target in (graph or {}).get("edges", []):
+            self.edges.setdefault(source, []).append(target)
+
+        self._owners: dict[str, list[int]] = {}
+        self._names = list(self.personas)
+        for rank, persona in enumerate(self.personas.values()):
+            for concept in persona.concepts.items:
+                key = concept if case_sensitive else concept.lower()
+                owners = self._owners.setdefault(key, [])
+                if rank not in owners:
+                    owners.append(rank)
+        self.matcher = PatternMatcher(self._owners, case_sensitive)
+        self.route = functools.lru_cache(maxsize=cache_size)(self._route)
+
+    def scores(self, query: str) -> dict[str, int]:
+        """Number of distinct concepts of each persona found in ``query``."""
+        totals = [0] * len(self._names)
+        for concept in self.matcher.matched(query):
+            for rank in self._owners[concept]:
+                totals[rank] += 1
+        return dict(zip(self._names, totals))
+
+    def _route(self, query: str) -> str:
+        best, best_score = self.default, 0
+        for name, score in self.scores(query).items():
+            if score > best_score:
+                best, best_score = name, score
+        return best
+
+    def neighbours(self, persona: str) -> list[str]:
+        return list(self.edges.get(persona, []))
@@ -0,0 +1,251 @@
+"""Compile JSON Schemas into specialised Python predicates with an on-disk cache.
+
+``compile_schema`` turns the keyword subset our schemas use (``type``,
+``required``, ``properties``, ``additionalProperties``, ``items``, ``enum``,
+length/size/range bounds, ``anyOf``/``allOf``/``oneOf``) into generated Python
+source that answers "is this instance valid?" without the generic
+``jsonschema`` dispatch.  The predicate is conservative: it may reject
+something that is valid (e.g. ``uniqueItems`` over non-string items) but never
+accepts an invalid instance.  Only when it rejects do we build the full
+``Draft202012Validator`` and ask it for errors, so messages are exactly the
+ones ``jsonschema`` reports.
+
+Generated source is cached under ``.cache/schema_validators`` keyed by the
+SHA-256 of the canonical schema and the compiler version, so later runs skip
+code generation.  Schemas using unsupported keywords are cached as "no fast
+path" and always go through ``jsonschema``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from jsonschema import Draft202012Validator, ValidationError
+
+COMPILER_VERSION = 1
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "schema_validators"
+
+ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+TYPE_TESTS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": (
+        "(isinstance({v}, int) and not isinstance({v}, bool)"
+        " or isinstance({v}, float) and {v}.is_integer())"
+    ),
+}
+BOUNDS = {
+    "minLength": ("string", "len({v}) < {n}"),
+    "maxLength": ("string", "len({v}) > {n}"),
+    "minItems": ("array", "len({v}) < {n}"),
+    "maxItems": ("array", "len({v}) > {n}"),
+    "minProperties": ("object", "len({v}) < {n}"),
+    "maxProperties": ("object", "len({v}) > {n}"),
+    "minimum": ("number", "{v} < {n}"),
+    "maximum": ("number", "{v} > {n}"),
+    "exclusiveMinimum": ("number", "{v} <= {n}"),
+    "exclusiveMaximum": ("number", "{v} >= {n}"),
+}
+OBJECT_KEYWORDS = {"required", "properties", "additionalProperties"}
+SUPPORTED = {"type", "enum", "items", "uniqueItems", "anyOf", "allOf", "oneOf"}
+SUPPORTED |= ANNOTATIONS | OBJECT_KEYWORDS | set(BOUNDS)
+
+Check = Callable[[object], bool]
+
+
+class UnsupportedSchema(ValueError):
+    """The schema uses a keyword the compiler does not translate."""
+
+
+def _unique_strings(items: list) -> bool:
+    # Only strings are compared here; jsonschema's equality rules for mixed
+    # types (1 vs True, 1 vs 1.0) are left to the full validator.
+    return all(isinstance(item, str) for item in items) and len(set(items)) == len(items)
+
+
+class _Generator:
+    def __init__(self) -> None:
+        self.functions: list[str] = []
+
+    def function(self, schema: object) -> str:
+        index = len(self.functions)
+        name = f"_check_{index}"
+        self.functions.append("")
+        body = self.body(schema, "v", "    ")
+        self.functions[index] = "\n".join([f"def {name}(v):", *body, "    return True", ""])
+        return name
+
+    def body(self, schema: object, v: str, indent: str) -> list[str]:
+        if schema is True or schema == {}:
+            return []
+        if schema is False:
+            return [f"{indent}return False"]
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"schema must be an object or boolean, got {schema!r}")
+        unknown = set(schema) - SUPPORTED
+        if unknown:
+            raise UnsupportedSchema(f"unsupported keywords: {sorted(unknown)}")
+
+        lines: list[str] = []
+
+        def fail_if(condition: str) -> None:
+            lines.append(f"{indent}if {condition}:")
+            lines.append(f"{indent}    return False")
+
+        if "type" in schema:
+            types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            if any(name not in TYPE_TESTS for name in types):
+                raise UnsupportedSchema(f"unsupported type: {schema['type']!r}")
+            fail_if("not (" + " or ".join(TYPE_TESTS[t].format(v=v) for t in types) + ")")
+        if "enum" in schema:
+            choices = schema["enum"]
+            if not all(isinstance(choice, str) for choice in choices):
+                raise UnsupportedSchema("enum with non-string members")
+            fail_if(f"not (isinstance({v}, str) and {v} in {frozenset(choices)!r})")
+        for keyword, (kind, test) in BOUNDS.items():
+            if keyword in schema:
+                bound = schema[keyword]
+                if isinstance(bound, bool) or not isinstance(bound, (int, float)):
+                    raise UnsupportedSchema(f"{keyword} must be a number")
+                guard = TYPE_TESTS[kind].format(v=v)
+                fail_if(f"{guard} and {test.format(v=v, n=repr(bound))}")
+
+        if OBJECT_KEYWORDS & set(schema):
+            inner = indent + "    "
+            block: list[str] = []
+            for key in schema.get("required", []):
+                block += [f"{inner}if {key!r} not in {v}:", f"{inner}    return False"]
+            properties = schema.get("properties", {})
+            for key, subschema in properties.items():
+                check = self.function(subschema)
+                block += [
+                    f"{inner}if {key!r} in {v} and not {check}({v}[{key!r}]):",
+                    f"{inner}    return False",
+                ]
+            extra = schema.get("additionalProperties", True)
+            if extra is False:
+                block += [
+                    f"{inner}for key in {v}:",
+                    f"{inner}    if key not in {frozenset(properties)!r}:",
+                    f"{inner}        return False",
+                ]
+            elif extra is not True:
+                check = self.function(extra)
+                block += [
+                    f"{inner}for key, item in {v}.items():",
+                    f"{inner}    if key not in {frozenset(properties)!r} and not {check}(item):",
+                    f"{inner}        return False",
+                ]
+            if block:
+                lines += [f"{indent}if isinstance({v}, dict):", *block]
+
+        if "items" in schema or schema.get("uniqueItems"):
+            inner = indent + "    "
+            block = []
+            if "items" in schema:
+                check = self.function(schema["items"])
+                block += [
+                    f"{inner}for item in {v}:",
+                    f"{inner}    if not {check}(item):",
+                    f"{inner}        return False",
+                ]
+            if schema.get("uniqueItems"):
+                block += [f"{inner}if not _unique_strings({v}):", f"{inner}    return False"]
+            lines += [f"{indent}if isinstance({v}, list):", *block]
+
+        for keyword, combine in (("anyOf", "any"), ("allOf", "all"), ("oneOf", "one")):
+            if keyword in schema:
+                checks = [self.function(subschema) for subschema in schema[keyword]]
+                calls = ", ".join(f"{check}({v})" for check in checks)
+                if combine == "one":
+                    fail_if(f"[{calls}].count(True) != 1")
+                else:
+                    fail_if(f"not {combine}(({calls},))")
+        return lines
+
+
+def schema_key(schema: dict) -> str:
+    canonical = json.dumps(schema, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{COMPILER_VERSION}:{canonical}".encode()).hexdigest()
+
+
+def generate_source(schema: dict) -> str:
+    """Python source defining ``validate(instance) -> bool``; ``validate = None`` if unsupported."""
+    generator = _Generator()
+    try:
+        entry = generator.function(schema)
+    except UnsupportedSchema as exc:
+        return f"# no fast path: {exc}\nvalidate = None\n"
+    return "\n".join([*generator.functions, f"validate = {entry}", ""])
+
+
+def _load_source(schema: dict, cache_dir: Path | None) -> str:
+    if cache_dir is None:
+        return generate_source(schema)
+    path = cache_dir / f"{schema_key(schema)}.py"
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        pass
+    source = generate_source(schema)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(source, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a read-only checkout still validates, it just recompiles next time
+    return source
+
+
+class CompiledSchema:
+    """A schema with a generated fast-path predicate and a lazily built full validator."""
+
+    def __init__(self, schema: dict, check: Check | None) -> None:
+        self.schema = schema
+        self.check = check
+        self._validator: Draft202012Validator | None = None
+
+    @property
+    def validator(self) -> Draft202012Validator:
+        if self._validator is None:
+            self._validator = Draft202012Validator(self.schema)
+        return self._validator
+
+    def is_valid(self, instance: object) -> bool:
+        if self.check is not None and self.check(instance):
+            return True
+        return self.validator.is_valid(instance)
+
+    def iter_errors(self, instance: object) -> Iterator[ValidationError]:
+        if self.check is not None and self.check(instance):
+            return iter(())
+        return self.validator.iter_errors(instance)
+
+    def validate(self, instance: object) -> None:
+        if self.check is None or not self.check(instance):
+            self.validator.validate(instance)
+
+
+_COMPILED: dict[tuple[str, Path | None], CompiledSchema] = {}
+
+
+def compile_schema(schema: dict, cache_dir: Path | None = CACHE_DIR) -> CompiledSchema:
+    """Compile ``schema`` once per process, reusing generated source from ``cache_dir``."""
+    key = (schema_key(schema), cache_dir)
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        namespace: dict[str, object] = {"_unique_strings": _unique_strings}
+        code = compile(_load_source(schema, cache_dir), "<schema-validator>", "exec")
+        exec(code, namespace)  # noqa: S102 - source is generated by this module
+        check = namespace["validate"]
+        compiled = _COMPILED[key] = CompiledSchema(schema, check)  # type: ignore[arg-type]
+    return compiled
@@ -0,0 +1,147 @@
+"""Keep the tail of a text stream within a character, word or token budget.
+
+``TailTrimmer`` is fed chunks as they are produced and only retains the part
+of the stream that can still end up in the tail, so memory stays
+proportional to the budget (plus the largest chunk) however long the stream
+is.  The cut never splits a grapheme cluster: combining marks, variation
+selectors, emoji modifiers, ZWJ sequences, regional-indicator pairs and CRLF
+stay with the character they extend, the cut moving forward so the budget
+still holds.  This approximates Unicode extended grapheme clusters without
+the ``regex`` module.
+
+Budgets:
+
+* ``"char"``  – at most ``budget`` code points; with ``word_safe`` the cut
+  also moves to the next word start unless the tail is a single long word;
+* ``"word"``  – the last ``budget`` whitespace-separated words;
+* ``"token"`` – the last ``budget`` matches of ``pattern`` (by default words
+  and single punctuation marks).
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+
+UNITS = ("char", "word", "token")
+WORD_PATTERN = re.compile(r"\S+")
+SPACE_PATTERN = re.compile(r"\s")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+ZWJ = "\u200d"
+# Code points kept before a cut so boundary checks can look back.
+LOOKBEHIND = 64
+MIN_BUFFER = 1 << 12
+
+
+def _extends(char: str) -> bool:
+    return (
+        unicodedata.category(char) in ("Mn", "Mc", "Me")
+        or char == ZWJ
+        or "\ufe00" <= char <= "\ufe0f"
+        or "\U0001f3fb" <= char <= "\U0001f3ff"
+        or "\U000e0020" <= char <= "\U000e007f"
+    )
+
+
+def _regional(char: str) -> bool:
+    return "\U0001f1e6" <= char <= "\U0001f1ff"
+
+
+def is_boundary(text: str, index: int) -> bool:
+    """Whether ``text[index:]`` starts a new grapheme cluster."""
+    if index <= 0 or index >= len(text):
+        return True
+    before, char = text[index - 1], text[index]
+    if before == "\r" and char == "\n":
+        return False
+    if before == ZWJ or _extends(char):
+        return False
+    if _regional(before) and _regional(char):
+        run = 0
+        while index - run > 0 and _regional(text[index - run - 1]):
+            run += 1
+        return run % 2 == 0
+    return True
+
+
+def _next_boundary(text: str, index: int) -> int:
+    while not is_boundary(text, index):
+        index += 1
+    return index
+
+
+def _next_word_start(text: str, index: int) -> int | None:
+    if index == 0 or text[index - 1].isspace():
+        match = WORD_PATTERN.search(text, index)
+    else:
+        gap = SPACE_PATTERN.search(text, index)
+        match = WORD_PATTERN.search(text, gap.start()) if gap else None
+    return match.start() if match else None
+
+
+class TailTrimmer:
+    def __init__(
+        self,
+        budget: int = 200,
+        unit: str = "char",
+        *,
+        word_safe: bool = False,
+        pattern: re.Pattern[str] | None = None,
+    ) -> None:
+        if unit not in UNITS:
+            raise ValueError(f"unit must be one of {UNITS}, got {unit!r}")
+        if budget < 0:
+            raise ValueError("budget must not be negative")
+        self.budget = budget
+        self.unit = unit
+        self.word_safe = word_safe
+        self.pattern = pattern or (WORD_PATTERN if unit == "word" else TOKEN_PATTERN)
+        self._chunks: list[str] = []
+        self._size = 0
+        self._limit = MIN_BUFFER
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        if self._size > self._limit:
+            text = "".join(self._chunks)
+            text = text[max(0, self._raw_cut(text) - LOOKBEHIND) :]
+            self._chunks, self._size = [text], len(text)
+            self._limit = max(MIN_BUFFER, 2 * self._size)
+
+    def _raw_cut(self, text: str) -> int:
+        """Earliest index the tail can start at; only moves forward as text is added."""
+        if self.unit == "char":
+            return max(0, len(text) - self.budget)
+        if self.budget == 0:
+            return len(text)
+        starts: deque[int] = deque(maxlen=self.budget)
+        for match in self.pattern.finditer(text):
+            starts.append(match.start())
+        return starts[0] if len(starts) == self.budget else 0
+
+    def result(self) -> str:
+        text = "".join(self._chunks)
+        self._chunks, self._size = [text], len(text)
+        raw = self._raw_cut(text)
+        cut = _next_boundary(text, raw)
+        if self.word_safe and self.unit == "char" and raw > 0:
+            start = _next_word_start(text, raw)
+            if start is not None:
+                cut = _next_boundary(text, start)
+        return text[cut:]
+
+
+def trim_stream(
+    chunks: Iterable[str], budget: int = 200, unit: str = "char", **options: Any
+) -> str:
+    """Tail of the concatenated ``chunks`` within ``budget`` (see ``TailTrimmer``)."""
+    trimmer = TailTrimmer(budget, unit, **options)
+    for chunk in chunks:
+        trimmer.feed(chunk)
+    return trimmer.result()
@@ -0,0 +1,517 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from itertools import pairwise
+from pathlib import Path
+from typing import BinaryIO
+
+import pytest
+from common import (
+    journal_checkpoint,
+    journal_columns,
+    journal_index,
+    journal_io,
+    journal_join,
+    journal_segments,
+)
+from common.journal_columns import ColumnarJournal
+from common.journal_index import JournalIndex
+from common.journal_io import (
+    JournalDecodeError,
+    iter_jsonl,
+    sealed_segments,
+    segment_dir,
+    shard_ranges,
+    tail_jsonl,
+)
+from common.journal_writer import JournalWriter
+from common.schema_compiler import compile_schema, schema_key
+from jsonschema import Draft202012Validator
+from SpaceCoreIskra_vOmega.modules import ci_aggregate as bundle_aggregate
+from tools import ci_aggregate, validate_journal_enhanced, validate_json_schemas
+
+
+def _entry(n: int, **overrides: object) -> dict:
+    entry = {
+        "facet": "Лиора" if n % 2 else "Вирдус",
+        "snapshot": f"s{n}",
+        "answer": f"a{n}",
+        "∆": n % 3 - 1,
+        "D": n % 9,
+        "Ω": 1,
+        "Λ": n,
+        "mirror": f"shadow-{n:03d}",
+        "events": {"evidence": ["README.md"]},
+        "marks": [{"id": f"M-{n:03d}"}],
+    }
+    entry.update(overrides)
+    return entry
+
+
+def _write_jsonl(path: Path, rows: list[dict], *, blank_every: int = 0) -> Path:
+    with path.open("w", encoding="utf-8") as handle:
+        for index, row in enumerate(rows, 1):
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+            if blank_every and index % blank_every == 0:
+                handle.write("\n")
+    return path
+
+
+def test_tail_jsonl_matches_full_parse(tmp_path: Path) -> None:
+    rng = random.Random(3)
+    for case in range(20):
+        rows = [_entry(n) for n in range(rng.randint(0, 40))]
+        path = _write_jsonl(tmp_path / f"j{case}.jsonl", rows, blank_every=rng.randint(0, 4))
+        if case % 3 == 0 and rows:
+            path.write_bytes(path.read_bytes().rstrip(b"\n"))
+        full = list(iter_jsonl(path))
+        for window in (1, 5, 50):
+            assert tail_jsonl(path, window, block_size=rng.randint(7, 300)) == full[-window:]
+
+
+def test_tail_jsonl_only_parses_the_tail(tmp_path: Path) -> None:
+    path = tmp_path / "JOURNAL.jsonl"
+    path.write_text("{broken\n" + json.dumps(_entry(1)) + "\n", encoding="utf-8")
+    assert [ln for ln, _ in tail_jsonl(path, 1)] == [2]
+    with pytest.raises(JournalDecodeError, match=":1 invalid JSON"):
+        tail_jsonl(path, 2)
+
+
+def test_tail_and_full_readers_split_lines_alike(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "JOURNAL.jsonl"
+    rows = [json.dumps(_entry(n)).encode("utf-8") for n in range(12)]
+    path.write_bytes(b"\r\r\n".join(rows) + b"\r\r\n\r\n")
+    full = list(iter_jsonl(path))
+    assert [ln for ln, _ in full] == list(range(1, 13))
+    for window in (1, 5, 20):
+        assert tail_jsonl(path, window, block_size=16) == full[-window:]
+
+    # A checkpoint anchors the numbering, so only the bytes after it are counted.
+    sidecar = tmp_path / "aggregate.ckpt.json"
+    ci_aggregate.aggregate(str(path), None, str(sidecar))
+    checkpointed = path.stat().st_size
+    with path.open("ab") as handle:
+        handle.write(b"".join(json.dumps(_entry(n)).encode("utf-8") + b"\n" for n in range(12, 20)))
+    anchor = journal_checkpoint.line_anchor(path, sidecar)
+    assert anchor == (checkpointed, 13)
+    counted: list[tuple[int, int | None]] = []
+    count_newlines = journal_io.count_newlines
+
+    def spy(target: str | Path, end: int | None = None, start: int = 0) -> int:
+        counted.append((start, end))
+        return count_newlines(target, end, start)
+
+    monkeypatch.setattr(journal_io, "count_newlines", spy)
+    expected = list(iter_jsonl(path))[-3:]
+    assert tail_jsonl(path, 3, anchor=anchor) == expected
+    assert counted and all(start >= checkpointed for start, _ in counted)
+    validate = validate_journal_enhanced.run_validation
+    assert validate(str(path), "", window=3, checkpoint=str(sidecar)) == validate(str(path), "", 3)
+
+
+def test_validate_streams_window_and_full_file(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(n) for n in range(1, 11)])
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", [{"mirror": "shadow-001"}] * 2)
+    assert validate_journal_enhanced.validate(str(main), str(shadow), window=0) == 0
+    report = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert report["count"] == 10 and report["avg"]["Λ"] == 5.5
+    assert validate_journal_enhanced.validate(str(main), str(shadow), window=5) == 0
+    report = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert report == {"count": 5, "avg": report["avg"], "shadow_ratio": 0.4}
+    assert report["avg"]["Λ"] == 8.0
+
+    _write_jsonl(main, [_entry(1, mirror=""), _entry(2)])
+    assert validate_journal_enhanced.validate(str(main), str(shadow), window=1) == 0
+    assert validate_journal_enhanced.validate(str(main), str(shadow), window=0) == 2
+    assert f"{main}:1: mirror is required" in capsys.readouterr().out
+
+
+def test_shard_ranges_cover_file_on_line_boundaries(tmp_path: Path) -> None:
+    path = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(n) for n in range(50)], blank_every=7)
+    data = path.read_bytes()
+    for shards in (1, 3, 16, 500):
+        ranges = shard_ranges(path, shards)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == nxt for (_, end), (nxt, _) in pairwise(ranges))
+        assert all(start == 0 or data[start - 1 : start] == b"\n" for start, _ in ranges)
+
+
+def test_parallel_validation_matches_serial(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    rows = [_entry(n, D=n / 7) for n in range(1, 120)]
+    rows[40]["mirror"] = ""
+    rows[90]["∆"] = -3
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows, blank_every=11)
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", [{"mirror": "m"}, {"note": "x"}] * 20)
+    outputs = []
+    for jobs in (1, 3):
+        code = validate_journal_enhanced.validate(str(main), str(shadow), window=0, jobs=jobs)
+        outputs.append((code, capsys.readouterr().out))
+    assert outputs[0] == outputs[1] and outputs[0][0] == 2
+
+    del rows[40], rows[89]
+    _write_jsonl(main, rows, blank_every=11)
+    for jobs in (1, 3):
+        assert validate_journal_enhanced.validate(str(main), "", window=0, jobs=jobs) == 2
+        outputs.append((jobs, capsys.readouterr().out))
+    assert outputs[2][1] == outputs[3][1]
+
+    with main.open("a", encoding="utf-8") as handle:
+        handle.write("{oops\n")
+    for jobs in (1, 3):
+        with pytest.raises(SystemExit, match=f"{main}:{len(rows) + 10 + 1} invalid JSON"):
+            validate_journal_enhanced.validate(str(main), "", window=0, jobs=jobs)
+
+
+def test_parallel_schema_validation_matches_serial(tmp_path: Path) -> None:
+    rows = [_entry(n) for n in range(60)]
+    rows[5]["D"] = 12
+    rows[33].pop("answer")
+    path = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows, blank_every=9)
+    validator = validate_json_schemas.load_schema(validate_json_schemas.SCHEMAS["journal"])
+    serial = validate_json_schemas.validate_jsonl(path, validator)
+    assert len(serial) == 2
+    assert validate_json_schemas.validate_jsonl(path, validator, jobs=3) == serial
+
+
+def test_ci_aggregate_checkpoint_parses_only_appended_lines(tmp_path: Path) -> None:
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(n, D=n / 3) for n in range(30)])
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", [{"mirror": "m"}] * 7)
+    sidecar = tmp_path / "aggregate.ckpt.json"
+    assert ci_aggregate.aggregate(str(main), str(shadow), str(sidecar)) == ci_aggregate.aggregate(
+        str(main), str(shadow)
+    )
+
+    with main.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(99, facet="Новая")) + "\n" + json.dumps(_entry(100)))
+    stored = json.loads(sidecar.read_text(encoding="utf-8"))["main"]
+    incremental = ci_aggregate.aggregate(str(main), str(shadow), str(sidecar))
+    assert incremental == ci_aggregate.aggregate(str(main), str(shadow))
+    assert incremental["count"] == 32 and "Новая" in incremental["facets"]
+    advanced = json.loads(sidecar.read_text(encoding="utf-8"))["main"]
+    assert advanced["count"] == 31 and advanced["offset"] > stored["offset"]
+
+    _write_jsonl(main, [_entry(1), _entry(2)])
+    assert ci_aggregate.aggregate(str(main), str(shadow), str(sidecar))["count"] == 2
+
+
+def test_checkpoint_readers_tolerate_a_line_being_written(tmp_path: Path) -> None:
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(n) for n in range(5)])
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", [{"mirror": "m"}, [1], "note"])
+    with main.open("a", encoding="utf-8") as handle:
+        handle.write('{"facet": "Лиора", "D":')
+    sidecar = tmp_path / "aggregate.ckpt.json"
+    result = ci_aggregate.aggregate(str(main), str(shadow), str(sidecar))
+    assert result["count"] == 5 and result["shadow_ratio"] == 0.6
+    assert len(ColumnarJournal.open(main, tmp_path / "JOURNAL.cols")) == 5
+    with JournalIndex.open(main) as index:
+        assert index.get("mirror", "shadow-004") == _entry(4)
+
+    with main.open("a", encoding="utf-8") as handle:
+        handle.write(' 4, "mirror": "shadow-x"}\n')
+    assert ci_aggregate.aggregate(str(main), str(shadow), str(sidecar))["count"] == 6
+    with JournalIndex.open(main) as index:
+        assert index.get("mirror", "shadow-x") == {"facet": "Лиора", "D": 4, "mirror": "shadow-x"}
+
+
+def test_bundle_aggregate_file_matches_in_memory_aggregate(tmp_path: Path) -> None:
+    rows = [_entry(n) for n in range(12)]
+    path = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows)
+    expected = bundle_aggregate.aggregate(rows)
+    result = bundle_aggregate.aggregate_file(path, tmp_path / "ckpt.json")
+    assert result == {**expected, "facets": sorted(expected["facets"])}
+    assert bundle_aggregate.aggregate_file(path, tmp_path / "ckpt.json") == result
+
+
+def test_columnar_store_syncs_incrementally_and_matches_python_path(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rows = [_entry(n, D=(n * 7) % 10 / 1.5) for n in range(40)]
+    rows[3].pop("D")
+    rows[4]["D"] = None
+    rows[5]["D"] = True
+    journal = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows)
+    store = tmp_path / "JOURNAL.cols"
+    columns = ColumnarJournal.open(journal, store)
+    assert len(columns) == 40
+
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(41, facet="Поисковик", D=4.5)) + "\n")
+    reopened = ColumnarJournal.open(journal, store)
+    assert len(reopened) == 41 and reopened.sync() == 0
+    with journal.open("rb") as handle:
+        handle.seek(reopened.offsets[-1])
+        assert json.loads(handle.readline())["facet"] == "Поисковик"
+
+    by_facet = reopened.query("D", by="facet", last=30)
+    tail = [r for r in rows[-29:] if "D" in r] + [_entry(41, facet="Поисковик", D=4.5)]
+    for facet, value in by_facet.items():
+        values = [r["D"] for r in tail if r["facet"] == facet]
+        assert value == pytest.approx(sum(values) / len(values))
+    assert reopened.query("D", agg="count", where={"facet": "Поисковик"}) == 1
+    assert reopened.query("D", agg="count") == 41 - 3  # missing, null and bool D are NaN
+    assert reopened.query("D", by="facet", where={"mirror": "nope"}) == {}
+
+    queries = [(agg, by) for agg in journal_columns.AGGREGATES for by in (None, "facet", "mirror")]
+    vectorised = [reopened.query("D", agg=agg, by=by, last=30) for agg, by in queries]
+    monkeypatch.setattr(journal_columns, "np", None)
+    for (agg, by), expected in zip(queries, vectorised):
+        assert reopened.query("D", agg=agg, by=by, last=30) == pytest.approx(expected)
+    assert reopened.query("Λ", agg="max") == 41.0
+
+    _write_jsonl(journal, rows[:5])
+    assert len(ColumnarJournal.open(journal, store)) == 5
+
+
+def test_compiled_schema_reports_the_same_errors_as_jsonschema(tmp_path: Path) -> None:
+    schema = json.loads(validate_json_schemas.SCHEMAS["journal"].read_text(encoding="utf-8"))
+    compiled = compile_schema(schema, tmp_path)
+    assert compiled.check is not None
+    assert (tmp_path / f"{schema_key(schema)}.py").exists()
+    full = Draft202012Validator(schema)
+    cases = [
+        _entry(1),
+        _entry(2, D=12),
+        _entry(3, D=True),
+        _entry(4, events={"evidence": []}),
+        _entry(5, agent_step={"approved": "yes"}),
+        {**_entry(6), "unknown": 1},
+        {"facet": ""},
+        [],
+    ]
+    for case in cases:
+        expected = [error.message for error in full.iter_errors(case)]
+        assert [error.message for error in compiled.iter_errors(case)] == expected
+        assert not expected or not compiled.check(case)
+
+    unsupported = compile_schema({"type": "string", "pattern": "^a"}, tmp_path)
+    assert unsupported.check is None
+    assert [e.message for e in unsupported.iter_errors("b")] == ["'b' does not match '^a'"]
+
+
+def _rotated_pair(tmp_path: Path, rows: list[dict]) -> tuple[Path, Path]:
+    """The same entries as a plain journal and as one sealed twice (the last rows unsealed)."""
+    plain = _write_jsonl(tmp_path / "plain" / "JOURNAL.jsonl", rows, blank_every=7)
+    journal = tmp_path / "rotated" / "JOURNAL.jsonl"
+    data = plain.read_bytes().splitlines(keepends=True)
+    thirds = [data[: len(data) // 3], data[len(data) // 3 : 2 * len(data) // 3]]
+    for part in thirds:
+        with journal.open("ab") as handle:
+            handle.write(b"".join(part))
+        assert journal_segments.seal(journal) is not None
+    journal.write_bytes(b"".join(data[2 * len(data) // 3 :]))
+    return plain, journal
+
+
+def test_segmented_journal_reads_like_the_plain_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "plain").mkdir()
+    (tmp_path / "rotated").mkdir()
+    rows = [_entry(n, D=n / 7) for n in range(1, 90)]
+    rows[10]["mirror"] = ""
+    plain, journal = _rotated_pair(tmp_path, rows)
+    segments = sealed_segments(journal)
+    assert [s.path.name for s in segments] == ["000001.jsonl.gz", "000002.jsonl.gz"]
+    assert journal.stat().st_size < plain.stat().st_size // 2
+
+    assert list(iter_jsonl(journal)) == list(iter_jsonl(plain))
+    for window in (1, 20, 70, 200):
+        assert tail_jsonl(journal, window) == tail_jsonl(plain, window)
+    for jobs in (1, 2):
+        expected = validate_journal_enhanced.run_validation(str(plain), "", window=0, jobs=jobs)
+        result = validate_journal_enhanced.run_validation(str(journal), "", window=0, jobs=jobs)
+        assert result[1] == [line.replace(str(plain), str(journal)) for line in expected[1]]
+    validator = validate_json_schemas.load_schema(validate_json_schemas.SCHEMAS["journal"])
+    expected = validate_json_schemas.validate_jsonl(plain, validator)
+    for jobs in (1, 2):
+        result = validate_json_schemas.validate_jsonl(journal, validator, jobs=jobs)
+        assert result == [line.replace(str(plain), str(journal)) for line in expected]
+
+    assert ColumnarJournal(journal).sync() == len(rows)
+    sidecar = tmp_path / "aggregate.ckpt.json"
+    expected_aggregate = ci_aggregate.aggregate(str(plain))
+    open_binary = journal_io.open_binary
+
+    def open_active(path: str | Path) -> BinaryIO:
+        assert Path(path) == journal, f"decompressed {path}"
+        return open_binary(path)
+
+    with monkeypatch.context() as patched:
+        # Aggregates come from the segment summaries; no segment is decompressed.
+        patched.setattr(journal_io, "open_binary", open_active)
+        assert ci_aggregate.aggregate(str(journal), None, str(sidecar)) == expected_aggregate
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(99, facet="Новая")) + "\n")
+    journal_segments.seal(journal, "none")
+    stored = json.loads(sidecar.read_text(encoding="utf-8"))["main"]
+    result = ci_aggregate.aggregate(str(journal), None, str(sidecar))
+    assert result["count"] == len(rows) + 1 and "Новая" in result["facets"]
+    assert json.loads(sidecar.read_text(encoding="utf-8"))["main"]["sealed"] == stored["sealed"] + 1
+    assert journal.stat().st_size == 0
+
+
+def test_rotation_policy_and_interrupted_seal(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # due() only reads; the age clock of a never-sealed journal starts in maybe_rotate().
+    fresh = tmp_path / "FRESH.jsonl"
+    _write_jsonl(fresh, [_entry(0)])
+    aged = journal_segments.RotationPolicy(max_bytes=None, max_age=60)
+    assert not aged.due(fresh) and not segment_dir(fresh).exists()
+    assert aged.maybe_rotate(fresh) is None
+    assert journal_segments.read_manifest(fresh)["active_since"] <= time.time()
+    assert aged.due(fresh, now=time.time() + 90)
+
+    journal = tmp_path / "JOURNAL.jsonl"
+    policy = journal_segments.RotationPolicy(max_bytes=2000)
+    with JournalWriter(journal, max_entries=5, flush_interval=None, rotation=policy) as writer:
+        for n in range(60):
+            writer.write(_entry(n))
+    assert len(sealed_segments(journal)) >= 3
+    assert [entry["Λ"] for _, entry in iter_jsonl(journal)] == list(range(60))
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(60)) + "\n")
+    assert aged.maybe_rotate(journal, now=time.time() + 30) is None
+    assert aged.maybe_rotate(journal, now=time.time() + 90) is not None
+    assert journal.stat().st_size == 0
+
+    # A crash after the segment is recorded but before the journal is cut.
+    journal.write_text(json.dumps(_entry(61)) + "\n" + '{"partial"', encoding="utf-8")
+
+    def crash(*args: object) -> None:
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patched, pytest.raises(KeyboardInterrupt):
+        patched.setattr(journal_segments, "_cut", crash)
+        journal_segments.seal(journal)
+    assert journal_segments.read_manifest(journal)["segments"][-1]["pending"]
+    assert sum(segment.entries for segment in sealed_segments(journal)) == 61
+    journal_segments.recover(journal)
+    assert journal.read_text(encoding="utf-8") == '{"partial"'
+    assert sum(segment.entries for segment in sealed_segments(journal)) == 62
+    journal.write_text("", encoding="utf-8")
+    assert [entry["Λ"] for _, entry in iter_jsonl(journal)] == list(range(62))
+
+    # The cut replaces the journal; a crash before the replace leaves it intact and
+    # a writer holding the old file follows the new one on its next flush.
+    with JournalWriter(journal, max_entries=1, flush_interval=None) as writer:
+        writer.write(_entry(62))
+        with monkeypatch.context() as patched, pytest.raises(KeyboardInterrupt):
+            patched.setattr(journal_segments.shutil, "copyfileobj", crash)
+            journal_segments.seal(journal)
+        assert json.loads(journal.read_text(encoding="utf-8"))["Λ"] == 62
+        journal_segments.recover(journal)
+        assert journal.stat().st_size == 0
+        writer.write(_entry(63))
+    assert [entry["Λ"] for _, entry in iter_jsonl(journal)] == list(range(64))
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_zstd_segments(tmp_path: Path) -> None:
+    pytest.importorskip("zstandard")
+    journal = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(n) for n in range(10)])
+    assert journal_segments.seal(journal, "zstd").path.suffix == ".zst"
+    assert [entry["Λ"] for _, entry in iter_jsonl(journal)] == list(range(10))
+
+
+def test_offset_index_lookups_stay_in_sync(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rows = [_entry(n) for n in range(50)]
+    rows[7]["marks"].append({"id": "M-shared"})
+    rows[9]["marks"].append({"id": "M-shared"})
+    journal = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows, blank_every=6)
+    with JournalIndex.open(journal) as index:
+        assert index.get("mirror", "shadow-002") == rows[2]
+        assert index.lookup("mark", "M-shared") == [rows[7], rows[9]]
+        assert index.lookup("facet", "Лиора", limit=2) == [rows[47], rows[49]]
+        assert index.get("mirror", "shadow-999") is None
+        with journal.open("rb") as handle:
+            for offset in index.offsets("mark", "M-010"):
+                handle.seek(offset)
+                assert json.loads(handle.readline()) == rows[10]
+    stored = (tmp_path / "JOURNAL.jsonl.idx").read_bytes()
+
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(50, mirror="shadow-002")) + "\n")
+    index = JournalIndex(journal)
+    assert index.load() and index.sync() == 1
+    assert index.lookup("mirror", "shadow-002") == [rows[2], _entry(50, mirror="shadow-002")]
+    index.save()
+    assert len(index) == len(JournalIndex.open(journal)) == 51 * 3 + 2
+    monkeypatch.setattr(journal_index, "np", None)
+    (tmp_path / "JOURNAL.jsonl.idx").write_bytes(stored)
+    assert JournalIndex.open(journal).path.read_bytes() == index.path.read_bytes()
+    index.close()
+
+    _write_jsonl(journal, rows[:12])
+    with JournalIndex.open(journal) as index:
+        assert len(index) == 12 * 3 + 2 and index.get("mirror", "shadow-020") is None
+    journal_segments.seal(journal, "none")
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(_entry(51)) + "\n")
+    with JournalIndex.open(journal) as index:
+        assert index.get("mark", "M-010") == rows[10]
+        assert index.get("mark", "M-051") == _entry(51)
+
+
+def test_shadow_join_reports_coverage_and_spills_to_disk(tmp_path: Path) -> None:
+    rows = [_entry(n, mirror=f"shadow-{n % 40:03d}") for n in range(120)]
+    rows[5]["mirror"] = ""
+    shadows = [{"mirror": f"shadow-{n:03d}"} for n in range(0, 60, 3)] + [{"note": "no mirror"}]
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", rows, blank_every=13)
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", shadows)
+    lines = {e["snapshot"]: ln for ln, e in iter_jsonl(main)}
+
+    covered = {f"shadow-{n:03d}" for n in range(0, 40, 3)}
+    expected_unmatched = [
+        (lines[r["snapshot"]], r["mirror"]) for r in rows if r["mirror"] not in covered
+    ]
+    report = journal_join.join(main, shadow, limit=None)
+    assert report.partitions == 0
+    assert report.entries == 120 and report.shadows == 21
+    assert report.matched == len(covered)
+    assert report.unmatched.items() == expected_unmatched
+    assert report.orphaned.items() == [
+        (ln, f"shadow-{n:03d}") for ln, n in zip(range(15, 21), range(42, 60, 3))
+    ] + [(21, "")]
+    for facet, share in report.coverage().items():
+        facet_rows = [r for r in rows if r["facet"] == facet]
+        assert share == round(sum(r["mirror"] in covered for r in facet_rows) / len(facet_rows), 3)
+
+    # The shadow side is smaller here; make it the larger one to build on main instead.
+    with shadow.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps({"mirror": "shadow-x", "notes": "x" * 40_000}) + "\n")
+    flipped = journal_join.join(main, shadow, limit=None)
+    spilled = journal_join.join(main, shadow, memory_budget=2_000, limit=None)
+    assert spilled.partitions > 1
+    assert flipped.to_dict() == spilled.to_dict()
+    assert flipped.unmatched.items() == report.unmatched.items()
+    assert flipped.orphaned.items() == [*report.orphaned.items(), (22, "shadow-x")]
+
+    # Only the first `limit` lines are kept, whichever side was built and however spilled.
+    for budget in (journal_join.MEMORY_BUDGET, 2_000):
+        bounded = journal_join.join(main, shadow, memory_budget=budget, limit=3)
+        assert len(bounded.unmatched) == len(expected_unmatched)
+        assert bounded.unmatched.items() == expected_unmatched[:3]
+        assert bounded.orphaned.items() == report.orphaned.items()[:3]
+
+    output = ci_aggregate.shadow_join(str(main), str(shadow), limit=2)
+    assert output["unmatched"] == len(report.unmatched) and len(output["unmatched_mirrors"]) == 2
+
+
+def test_shadow_join_counts_non_object_lines_as_unmirrored(tmp_path: Path) -> None:
+    main = _write_jsonl(tmp_path / "JOURNAL.jsonl", [_entry(0, mirror="m-0"), [1], "note"])
+    shadow = _write_jsonl(tmp_path / "SHADOW.jsonl", [{"mirror": "m-0"}, 7, None])
+    report = journal_join.join(main, shadow)
+    assert (report.entries, report.shadows, report.matched) == (3, 3, 1)
+    assert report.unmatched.items() == [(2, ""), (3, "")]
+    assert report.orphaned.items() == [(2, ""), (3, "")]
+    assert journal_join.join(main, shadow, memory_budget=1).to_dict() == report.to_dict()
+    assert ci_aggregate.shadow_join(str(main), str(shadow))["unmatched"] == 2
@@ -6,16 +6,26 @@ mandatory artefacts are present, manifests are coherent, and journals respect
 core stability rules.  It is intended to be the one-stop pre-release sanity
 check that mimics what a human curator would confirm before shipping.
 """
+
 from __future__ import annotations
 
 import argparse
 import json
-import subprocess
+import os
+import sys
+import time
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from tools.validate_journal_enhanced import run_validation
+
+SKIP_DIRS = {".git"}
 
 
 @dataclass
@@ -28,10 +38,20 @@ class ExpectedBundle:
     manifest: Path | None = None
     optional_files: Iterable[str] = field(default_factory=tuple)
 
-    def check_files(self) -> Dict[str, List[str]]:
-        missing: List[str] = []
-        extra: List[str] = []
-        present = {p.relative_to(self.root).as_posix() for p in self.root.rglob("*") if p.is_file()}
+    def check_files(self, inventory: list[Path] | None = None) -> dict[str, list[str]]:
+        """Compare the bundle against its file lists; ``inventory`` avoids a walk per bundle."""
+        missing: list[str] = []
+        extra: list[str] = []
+        if inventory is None:
+            present = {
+                p.relative_to(self.root).as_posix() for p in self.root.rglob("*") if p.is_file()
+            }
+        else:
+            present = {
+                p.relative_to(self.root).as_posix()
+                for p in inventory
+                if p.is_relative_to(self.root)
+            }
         req = {Path(f).as_posix() for f in self.required_files}
         opt = {Path(f).as_posix() for f in self.optional_files}
         for item in req:
@@ -53,20 +73,22 @@ class ExpectedBundle:
             return None
 
 
-def _run_validator(main: Path, shadow: Path | None) -> tuple[bool, str]:
-    cmd = [
-        "python",
-        str((REPO_ROOT / "tools" / "validate_journal_enhanced.py").resolve()),
-        str(main),
-    ]
-    if shadow:
-        cmd.extend(["--shadow", str(shadow)])
-    proc = subprocess.run(cmd, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    return proc.returncode == 0, proc.stdout.strip()
+def _run_validator(main: Path, shadow: Path | None, window: int = 50) -> tuple[bool, str]:
+    code, lines = run_validation(str(main), str(shadow) if shadow else "", window)
+    return code == 0, "\n".join(lines)
+
+
+def file_inventory(root: Path = REPO_ROOT) -> list[Path]:
+    """Every file under ``root`` from a single walk, shared by all ``check_files`` calls."""
+    files: list[Path] = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+        files.extend(Path(directory, name) for name in filenames)
+    return files
 
 
-def collect_expected_bundles() -> List[ExpectedBundle]:
-    bundles: List[ExpectedBundle] = []
+def collect_expected_bundles() -> list[ExpectedBundle]:
+    bundles: list[ExpectedBundle] = []
     bundles.append(
         ExpectedBundle(
             name="SpaceCoreIskra_vΩ",
@@ -213,32 +235,65 @@ def collect_expected_bundles() -> List[ExpectedBundle]:
     return bundles
 
 
-def generate_report(window: int) -> dict:
-    report = {"bundles": []}
-    for bundle in collect_expected_bundles():
-        entry: Dict[str, object] = {"name": bundle.name}
-        file_report = bundle.check_files()
+def audit_bundle(bundle: ExpectedBundle, window: int, inventory: list[Path] | None = None) -> dict:
+    """Audit one bundle; an error is recorded as ``ok: false`` instead of aborting the report."""
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    entry: dict[str, object] = {"name": bundle.name, "ok": True}
+    try:
+        file_report = bundle.check_files(inventory)
         entry.update(file_report)
+        timings["files"] = time.perf_counter() - started
         if bundle.manifest:
             manifest = bundle.read_manifest()
             entry["manifest"] = manifest or "missing"
         if bundle.journal:
-            ok, output = _run_validator(bundle.journal, bundle.shadow_journal)
+            step = time.perf_counter()
+            ok, output = _run_validator(bundle.journal, bundle.shadow_journal, window)
             entry["journal_validation"] = {
                 "ok": ok,
                 "output": output,
             }
-        report["bundles"].append(entry)
-    return report
+            timings["journal"] = time.perf_counter() - step
+    except Exception as exc:  # noqa: BLE001
+        entry["ok"] = False
+        entry["error"] = f"{type(exc).__name__}: {exc}"
+    timings["total"] = time.perf_counter() - started
+    entry["timings"] = {name: round(seconds, 4) for name, seconds in timings.items()}
+    return entry
+
+
+def generate_report(window: int, jobs: int | None = None, processes: bool = False) -> dict:
+    """Audit every bundle concurrently; bundles keep their order in the report."""
+    started = time.perf_counter()
+    bundles = collect_expected_bundles()
+    inventory = file_inventory()
+    # Each bundle only receives its own slice of the shared inventory.
+    slices = [[p for p in inventory if p.is_relative_to(b.root)] for b in bundles]
+    workers = max(1, jobs or len(bundles))
+    pool: Executor = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers)
+    with pool:
+        entries = list(pool.map(audit_bundle, bundles, [window] * len(bundles), slices))
+    return {"bundles": entries, "elapsed": round(time.perf_counter() - started, 4)}
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run a structured repository audit")
-    parser.add_argument("--window", type=int, default=50, help="Sliding window for journal validation")
-    parser.add_argument("--output", type=Path, default=None, help="Optional path to write JSON report")
+    parser.add_argument(
+        "--window", type=int, default=50, help="Sliding window for journal validation"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Optional path to write JSON report"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="Bundles audited concurrently (default: all)"
+    )
+    parser.add_argument(
+        "--processes", action="store_true", help="Use a process pool instead of threads"
+    )
     args = parser.parse_args()
 
-    report = generate_report(args.window)
+    report = generate_report(args.window, args.jobs, args.processes)
     text = json.dumps(report, ensure_ascii=False, indent=2)
     if args.output:
         args.output.write_text(text, encoding="utf-8")
@@ -1,32 +1,74 @@
 #!/usr/bin/env python3
 """Build distribution archive and manifest for SpaceCoreIskra-vOmega."""
+
 from __future__ import annotations
 
 import argparse
 import hashlib
 import json
+import mmap
 import os
 import pathlib
 import subprocess
+import sys
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DEFAULT_ZIP = ROOT / "dist" / "SpaceCoreIskra-vOmega_MAIN_CANON_DIST.zip"
 DEFAULT_MANIFEST = ROOT / "DIST_MANIFEST.json"
 DEFAULT_NOTE = ROOT / "DIST_NOTE.md"
+DEFAULT_CACHE = ROOT / ".cache" / "build_dist.json"
+CHUNK_SIZE = 1 << 20
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from common.parallel_zip import COMPRESSED_SUFFIXES
 
 
 def sha256_of(path: pathlib.Path) -> str:
     h = hashlib.sha256()
     with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(65536), b""):
-            if not chunk:
-                break
-            h.update(chunk)
+        size = os.fstat(fh.fileno()).st_size
+        if size:
+            # hashlib releases the GIL on large buffers, so threads hash in parallel.
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, size, CHUNK_SIZE):
+                    h.update(mm[start : start + CHUNK_SIZE])
     return h.hexdigest()
 
 
+def load_hash_cache(cache_path: pathlib.Path) -> dict[str, dict]:
+    """Digests of the previous build by path, with the size and ``mtime_ns`` they were taken at."""
+    try:
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_hash_cache(cache_path: pathlib.Path, cache: dict[str, dict]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, cache_path)
+
+
+def file_entry(file_path: pathlib.Path, cache: dict[str, dict] | None = None) -> dict:
+    """Manifest entry for ``file_path``; a digest in ``cache`` is reused and a new one recorded."""
+    rel = file_path.relative_to(ROOT).as_posix()
+    stat = file_path.stat()
+    cached = cache.get(rel) if cache is not None else None
+    if cached and (cached["bytes"], cached["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        digest = cached["sha256"]
+    else:
+        digest = sha256_of(file_path)
+    if cache is not None:
+        cache[rel] = {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    return {"path": rel, "bytes": stat.st_size, "sha256": digest}
+
+
 def tracked_files(exclude_prefixes: tuple[str, ...] = ("dist/",)) -> list[pathlib.Path]:
     output = subprocess.check_output(["git", "ls-files"], cwd=ROOT, text=True)
     files = []
@@ -39,25 +81,58 @@ def tracked_files(exclude_prefixes: tuple[str, ...] = ("dist/",)) -> list[pathli
     return files
 
 
-def build_archive(out_zip: pathlib.Path, files: list[pathlib.Path]) -> None:
+def file_stats(
+    files: list[pathlib.Path], generated: tuple[pathlib.Path, ...] = ()
+) -> dict[str, list[int]]:
+    """``[size, mtime_ns]`` by path, leaving out ``generated`` files rewritten on every run."""
+    skip = {path.resolve() for path in generated}
+    stats = {}
+    for file_path in files:
+        if file_path.resolve() not in skip:
+            stat = file_path.stat()
+            stats[file_path.relative_to(ROOT).as_posix()] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def archive_is_current(
+    out_zip: pathlib.Path,
+    stats: dict[str, list[int]],
+    cache: dict[str, dict],
+    store_compressed: bool,
+) -> bool:
+    """True when ``out_zip`` is untouched since it was built from files with these ``stats``."""
+    archived = cache.get(out_zip.relative_to(ROOT).as_posix())
+    if not out_zip.exists() or not archived or archived.get("store_compressed") != store_compressed:
+        return False
+    stat = out_zip.stat()
+    if (archived["bytes"], archived["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+        return False
+    return archived.get("contents") == stats
+
+
+def build_archive(
+    out_zip: pathlib.Path, files: list[pathlib.Path], store_compressed: bool = False
+) -> None:
     out_zip.parent.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(out_zip, "w", compression=zipfile.ZIP_DEFLATED) as zf:
         for file_path in files:
             rel = file_path.relative_to(ROOT).as_posix()
-            zf.write(file_path, arcname=rel)
-
-
-def build_manifest(manifest_path: pathlib.Path, files: list[pathlib.Path], extra: dict | None = None) -> dict:
-    entries = []
-    for file_path in files:
-        rel = file_path.relative_to(ROOT).as_posix()
-        entries.append(
-            {
-                "path": rel,
-                "bytes": file_path.stat().st_size,
-                "sha256": sha256_of(file_path),
-            }
-        )
+            if store_compressed and file_path.suffix.lower() in COMPRESSED_SUFFIXES:
+                zf.write(file_path, arcname=rel, compress_type=zipfile.ZIP_STORED)
+            else:
+                zf.write(file_path, arcname=rel)
+
+
+def build_manifest(
+    manifest_path: pathlib.Path,
+    files: list[pathlib.Path],
+    extra: dict | None = None,
+    jobs: int | None = None,
+    cache: dict[str, dict] | None = None,
+) -> dict:
+    # Digests of files whose size and mtime match ``cache`` are reused; new ones are recorded in it.
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        entries = list(pool.map(lambda path: file_entry(path, cache), files))
     manifest = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "files": entries,
@@ -89,28 +164,50 @@ def main() -> None:
     parser.add_argument("--manifest", type=pathlib.Path, default=DEFAULT_MANIFEST)
     parser.add_argument("--note", type=pathlib.Path, default=DEFAULT_NOTE)
     parser.add_argument("--version", default="0.1.0")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="threads used for hashing")
+    parser.add_argument(
+        "--hash-cache",
+        type=pathlib.Path,
+        default=DEFAULT_CACHE,
+        help="local digest cache keyed by path, size and mtime",
+    )
+    parser.add_argument(
+        "--no-hash-cache", action="store_true", help="rehash every file, ignoring the cache"
+    )
+    parser.add_argument(
+        "--store-compressed",
+        action="store_true",
+        help="store already-compressed file types without deflating",
+    )
     args = parser.parse_args()
 
+    cache = {} if args.no_hash_cache else load_hash_cache(args.hash_cache)
     files = tracked_files()
-    build_archive(args.out, files)
+    stats = file_stats(files, (args.manifest, args.note))
+    if archive_is_current(args.out, stats, cache, args.store_compressed):
+        print(f"{args.out} is up to date")
+    else:
+        build_archive(args.out, files, store_compressed=args.store_compressed)
 
     manifest = build_manifest(
         args.manifest,
         files,
         extra={"package": "SpaceCoreIskra-vOmega", "version": args.version},
+        jobs=args.jobs,
+        cache=cache,
     )
 
     # include archive itself as an entry with checksum
     if args.out.exists():
-        archive_entry = {
-            "path": args.out.relative_to(ROOT).as_posix(),
-            "bytes": args.out.stat().st_size,
-            "sha256": sha256_of(args.out),
-        }
+        archive_entry = file_entry(args.out, cache)
+        cache[archive_entry["path"]].update(store_compressed=args.store_compressed, contents=stats)
         manifest["files"].append(archive_entry)
-        args.manifest.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        args.manifest.write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
 
     write_note(args.note, manifest, args.out)
+    save_hash_cache(args.hash_cache, {e["path"]: cache[e["path"]] for e in manifest["files"]})
     print(f"Built {args.out} with {len(manifest['files'])} files")
 
 
@@ -1,18 +1,127 @@
 #!/usr/bin/env python3
-"""Ensure Unicode-named directories stay in sync with their ASCII mirrors."""
+"""Ensure Unicode-named directories stay in sync with their ASCII mirrors.
+
+Each tree is walked once with ``os.scandir``.  File contents are compared by
+SHA-256 digests kept in a manifest keyed by path, size and ``mtime_ns``, so
+files untouched since the previous run are never read again; changed files are
+hashed in a thread pool.  ``--since REV`` inspects only paths git reports as
+changed (plus untracked files) instead of walking the trees.
+"""
 
 from __future__ import annotations
 
-import filecmp
+import argparse
+import hashlib
 import json
+import os
+import subprocess
 import sys
-from pathlib import Path
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 MAP_PATH = REPO_ROOT / "common" / "unicode_ascii_map.json"
+MANIFEST_PATH = REPO_ROOT / ".cache" / "mirror_manifest.json"
+IGNORED_DIRS = {"__pycache__"}
+CHUNK_SIZE = 1 << 20
+
+# relative path -> stat result for files, None for directories
+Tree = dict[PurePosixPath, os.stat_result | None]
+
+
+class HashManifest:
+    """SHA-256 digests keyed by path; an entry is reused while size and mtime match."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self.entries: dict[str, list] = {}
+        if path is not None:
+            try:
+                self.entries = json.loads(path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.entries = {}
+
+    def lookup(self, path: Path, stat: os.stat_result) -> str | None:
+        entry = self.entries.get(str(path))
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def record(self, path: Path, stat: os.stat_result, digest: str) -> None:
+        self.entries[str(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.entries, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scan(root: Path) -> Tree:
+    tree: Tree = {}
+    pending = [(root, PurePosixPath())]
+    while pending:
+        directory, rel = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name in IGNORED_DIRS:
+                    continue
+                child = rel / entry.name
+                if entry.is_dir():
+                    tree[child] = None
+                    pending.append((Path(entry.path), child))
+                else:
+                    tree[child] = entry.stat()
+    return tree
+
+
+def _stat_paths(root: Path, paths: Iterable[PurePosixPath]) -> Tree:
+    tree: Tree = {}
+    for rel in paths:
+        try:
+            stat = (root / rel).stat()
+        except FileNotFoundError:
+            continue
+        tree[rel] = None if (root / rel).is_dir() else stat
+    return tree
 
 
-def compare_trees(src: Path, dst: Path) -> list[str]:
+def _digests(
+    paths: list[tuple[Path, os.stat_result]], manifest: HashManifest, pool: ThreadPoolExecutor
+) -> dict[Path, str]:
+    digests: dict[Path, str] = {}
+    stale: list[tuple[Path, os.stat_result]] = []
+    for path, stat in paths:
+        known = manifest.lookup(path, stat)
+        if known is None:
+            stale.append((path, stat))
+        else:
+            digests[path] = known
+    for (path, stat), digest in zip(stale, pool.map(sha256_file, [p for p, _ in stale])):
+        manifest.record(path, stat, digest)
+        digests[path] = digest
+    return digests
+
+
+def compare_trees(
+    src: Path,
+    dst: Path,
+    manifest: HashManifest | None = None,
+    pool: ThreadPoolExecutor | None = None,
+    paths: Iterable[PurePosixPath] | None = None,
+) -> list[str]:
+    """Compare ``src`` with ``dst`` (only ``paths`` relative to both when given)."""
     errors: list[str] = []
     if not src.exists():
         errors.append(f"missing source directory: {src}")
@@ -21,37 +130,133 @@ def compare_trees(src: Path, dst: Path) -> list[str]:
         errors.append(f"missing mirror directory: {dst}")
         return errors
 
-    src_files = sorted(p.relative_to(src) for p in src.rglob("*"))
-    dst_files = sorted(p.relative_to(dst) for p in dst.rglob("*"))
-    if src_files != dst_files:
+    if paths is None:
+        left, right = _scan(src), _scan(dst)
+    else:
+        wanted = sorted(set(paths))
+        left, right = _stat_paths(src, wanted), _stat_paths(dst, wanted)
+    if sorted(left) != sorted(right):
         errors.append(f"structure diverged between {src} and {dst}")
 
-    matcher = filecmp.dircmp(src, dst)
-    errors.extend(render_diff(src, dst, matcher))
+    manifest = manifest if manifest is not None else HashManifest()
+    own_pool = pool is None
+    pool = pool if pool is not None else ThreadPoolExecutor()
+    try:
+        errors.extend(_diff(src, dst, left, right, manifest, pool))
+    finally:
+        if own_pool:
+            pool.shutdown()
     return errors
 
 
-def render_diff(src: Path, dst: Path, matcher: filecmp.dircmp) -> list[str]:
+def _diff(
+    src: Path,
+    dst: Path,
+    left: Tree,
+    right: Tree,
+    manifest: HashManifest,
+    pool: ThreadPoolExecutor,
+) -> list[str]:
+    """Per-directory report in ``filecmp.dircmp`` order and wording."""
+    exclusive: dict[PurePosixPath, tuple[list[str], list[str]]] = {}
+    funny: dict[PurePosixPath, list[str]] = {}
+    differing: dict[PurePosixPath, list[str]] = {}
+    same_size: list[PurePosixPath] = []
+    jobs: list[tuple[Path, os.stat_result]] = []
+    for rel in sorted(left.keys() | right.keys(), key=lambda path: path.parts):
+        if _inside_exclusive(rel, left, right):
+            continue
+        if (rel in left) != (rel in right):
+            exclusive.setdefault(rel.parent, ([], []))[0 if rel in left else 1].append(rel.name)
+            continue
+        left_stat, right_stat = left[rel], right[rel]
+        if left_stat is None or right_stat is None:
+            if left_stat is not right_stat:
+                funny.setdefault(rel.parent, []).append(rel.name)
+        elif left_stat.st_size != right_stat.st_size:
+            differing.setdefault(rel.parent, []).append(rel.name)
+        else:
+            same_size.append(rel)
+            jobs += [(src / rel, left_stat), (dst / rel, right_stat)]
+
+    digests = _digests(jobs, manifest, pool)
+    for rel in same_size:
+        if digests[src / rel] != digests[dst / rel]:
+            differing.setdefault(rel.parent, []).append(rel.name)
+
     issues: list[str] = []
-    if matcher.left_only or matcher.right_only:
-        issues.append(
-            f"{src} vs {dst}: exclusive entries left_only={matcher.left_only} right_only={matcher.right_only}"
-        )
-    if matcher.diff_files or matcher.funny_files:
-        issues.append(
-            f"{src} vs {dst}: differing files diff={matcher.diff_files} funny={matcher.funny_files}"
-        )
-    for sub in matcher.subdirs.values():
-        issues.extend(render_diff(Path(sub.left), Path(sub.right), sub))
+    directories = exclusive.keys() | funny.keys() | differing.keys()
+    for directory in sorted(directories, key=lambda path: path.parts):
+        where = f"{src / directory} vs {dst / directory}"
+        left_only, right_only = exclusive.get(directory, ([], []))
+        if left_only or right_only:
+            issues.append(
+                f"{where}: exclusive entries left_only={left_only} right_only={right_only}"
+            )
+        diff_files, funny_files = sorted(differing.get(directory, [])), funny.get(directory, [])
+        if diff_files or funny_files:
+            issues.append(f"{where}: differing files diff={diff_files} funny={funny_files}")
     return issues
 
 
+def _inside_exclusive(rel: PurePosixPath, left: Tree, right: Tree) -> bool:
+    # Like dircmp, a directory present on one side only is listed, its contents are not.
+    return any((parent in left) != (parent in right) for parent in rel.parents[:-1])
+
+
+def changed_paths(rev: str) -> list[PurePosixPath]:
+    """Repo-relative paths changed since ``rev`` in git, including untracked files."""
+    commands = [
+        ["git", "diff", "--name-only", "--no-renames", "-z", rev, "--"],
+        ["git", "ls-files", "--others", "--exclude-standard", "-z"],
+    ]
+    paths: set[PurePosixPath] = set()
+    for command in commands:
+        result = subprocess.run(
+            command, cwd=REPO_ROOT, check=True, stdout=subprocess.PIPE, encoding="utf-8"
+        )
+        paths.update(PurePosixPath(name) for name in result.stdout.split("\0") if name)
+    return sorted(paths)
+
+
+def _pair_paths(
+    changed: list[PurePosixPath], unicode_dir: str, ascii_dir: str
+) -> list[PurePosixPath]:
+    return [
+        path.relative_to(path.parts[0])
+        for path in changed
+        if len(path.parts) > 1
+        and path.parts[0] in (unicode_dir, ascii_dir)
+        and not IGNORED_DIRS.intersection(path.parts)
+    ]
+
+
 def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", help="only inspect paths changed since this git revision")
+    parser.add_argument("--jobs", type=int, default=8, help="threads used to hash files")
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=MANIFEST_PATH,
+        help="digest cache keyed by path, size and mtime",
+    )
+    args = parser.parse_args()
+
     pairs = json.loads(MAP_PATH.read_text(encoding="utf-8"))
+    changed = changed_paths(args.since) if args.since else None
+    manifest = HashManifest(args.manifest)
     failures: list[str] = []
 
-    for unicode_dir, ascii_dir in pairs.items():
-        failures.extend(compare_trees(REPO_ROOT / unicode_dir, REPO_ROOT / ascii_dir))
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for unicode_dir, ascii_dir in pairs.items():
+            paths = None if changed is None else _pair_paths(changed, unicode_dir, ascii_dir)
+            if paths == []:
+                continue
+            failures.extend(
+                compare_trees(REPO_ROOT / unicode_dir, REPO_ROOT / ascii_dir, manifest, pool, paths)
+            )
+    manifest.save()
 
     if failures:
         print("[FAIL] Unicode/ASCII parity drift detected")
@@ -5,37 +5,86 @@ from __future__ import annotations
 
 import argparse
 import json
-from statistics import mean
-from typing import Iterable
+import sys
+from pathlib import Path
 
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-def iter_jsonl(path: str) -> Iterable[dict]:
-    with open(path, "r", encoding="utf-8") as handle:
-        for line in handle:
-            payload = line.strip()
-            if payload:
-                yield json.loads(payload)
+from common.journal_checkpoint import (
+    METRICS,
+    JournalCheckpoint,
+    advance,
+    load_checkpoints,
+    save_checkpoints,
+)
+from common.journal_io import JournalDecodeError
+from common.journal_join import MEMORY_BUDGET, join
+
+
+def aggregate(main: str, shadow: str | None = None, checkpoint: str | None = None) -> dict:
+    """Summarise ``main``; with ``checkpoint`` only bytes appended since the last run are parsed."""
+    stored = load_checkpoints(checkpoint) if checkpoint else {}
+    current: dict[str, JournalCheckpoint] = {}
+    for role, path in (("main", main), ("shadow", shadow)):
+        if not path:
+            current[role] = JournalCheckpoint()
+            continue
+        try:
+            stored[role], current[role] = advance(path, stored.get(role))
+        except JournalDecodeError as exc:
+            raise SystemExit(f"[FAIL] {exc}") from exc
+    if checkpoint:
+        save_checkpoints(checkpoint, stored)
+
+    main_state, shadow_state = current["main"], current["shadow"]
+    return {
+        "count": main_state.count,
+        "facets": sorted(main_state.facets),
+        "avg": {key: main_state.mean(key) for key in METRICS},
+        "shadow_ratio": round(shadow_state.count / max(1, main_state.count), 3),
+    }
+
+
+def shadow_join(
+    main: str, shadow: str, limit: int = 20, memory_budget: int = MEMORY_BUDGET
+) -> dict:
+    """Join ``main`` and ``shadow`` on ``mirror``: coverage per facet, unmatched and orphans."""
+    try:
+        return join(main, shadow, memory_budget, limit).to_dict()
+    except JournalDecodeError as exc:
+        raise SystemExit(f"[FAIL] {exc}") from exc
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("main", help="path to canonical JOURNAL.jsonl")
     parser.add_argument("--shadow", help="optional SHADOW_JOURNAL.jsonl path")
+    parser.add_argument(
+        "--checkpoint",
+        help="sidecar JSON storing offsets and running sums; later runs parse only appended lines",
+    )
+    parser.add_argument(
+        "--join",
+        action="store_true",
+        help="also join main and shadow entries by mirror (needs --shadow)",
+    )
+    parser.add_argument(
+        "--join-memory-mb",
+        type=int,
+        default=MEMORY_BUDGET >> 20,
+        help="hash table budget before the join spills partitions to disk",
+    )
     args = parser.parse_args()
+    if args.join and not args.shadow:
+        parser.error("--join needs --shadow")
 
-    main_entries = list(iter_jsonl(args.main))
-    shadow_entries = list(iter_jsonl(args.shadow)) if args.shadow else []
-
-    averages = {
-        key: mean([entry.get(key, 0) for entry in main_entries]) if main_entries else 0
-        for key in ["∆", "D", "Ω", "Λ"]
-    }
-    output = {
-        "count": len(main_entries),
-        "facets": sorted({entry.get("facet", "") for entry in main_entries}),
-        "avg": averages,
-        "shadow_ratio": round(len(shadow_entries) / max(1, len(main_entries)), 3),
-    }
+    output = aggregate(args.main, args.shadow, args.checkpoint)
+    if args.join:
+        output["join"] = shadow_join(
+            args.main, args.shadow, memory_budget=args.join_memory_mb << 20
+        )
     print(json.dumps(output, ensure_ascii=False, indent=2))
 
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Query journal metrics through the columnar store, or look entries up by key."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.journal_checkpoint import METRICS
+from common.journal_columns import AGGREGATES, CATEGORICAL, ColumnarJournal
+from common.journal_index import KINDS, JournalIndex
+
+
+def _where(pairs: list[str]) -> dict[str, str]:
+    where: dict[str, str] = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep or name not in CATEGORICAL:
+            raise SystemExit(f"--where expects one of {CATEGORICAL} as NAME=VALUE, got {pair!r}")
+        where[name] = value
+    return where
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("journal", type=Path, help="path to JOURNAL.jsonl")
+    parser.add_argument(
+        "--store",
+        type=Path,
+        help="columnar sidecar; created on first use and synced incrementally afterwards",
+    )
+    parser.add_argument("--metric", choices=METRICS, default="D")
+    parser.add_argument("--agg", choices=AGGREGATES, default="mean")
+    parser.add_argument("--by", choices=CATEGORICAL)
+    parser.add_argument("--last", type=int, help="only the last N entries")
+    parser.add_argument("--where", action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument(
+        "--find",
+        metavar="KIND=VALUE",
+        help=f"print the entries indexed under one of {KINDS} instead of aggregating",
+    )
+    parser.add_argument("--index", type=Path, help="offset index sidecar for --find")
+    args = parser.parse_args()
+
+    if args.find:
+        kind, sep, value = args.find.partition("=")
+        if not sep or kind not in KINDS:
+            raise SystemExit(f"--find expects one of {KINDS} as KIND=VALUE, got {args.find!r}")
+        with JournalIndex.open(args.journal, args.index) as index:
+            entries = index.lookup(kind, value, limit=args.last)
+        print(json.dumps(entries, ensure_ascii=False, indent=2))
+        return 0
+
+    columns = ColumnarJournal.open(args.journal, args.store)
+    result = columns.query(
+        args.metric, agg=args.agg, by=args.by, last=args.last, where=_where(args.where)
+    )
+    print(json.dumps({"entries": len(columns), "result": result}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Seal a journal into compressed segments once it is large or old enough."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.journal_io import sealed_segments
+from common.journal_segments import COMPRESSIONS, RotationPolicy, seal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("journal", type=Path, help="path to JOURNAL.jsonl")
+    parser.add_argument("--max-bytes", type=int, default=64 << 20, help="seal at this size")
+    parser.add_argument("--max-age-hours", type=float, help="seal this long after the last seal")
+    parser.add_argument("--compression", choices=sorted(COMPRESSIONS), default="gzip")
+    parser.add_argument("--force", action="store_true", help="seal now whatever the policy")
+    parser.add_argument("--status", action="store_true", help="only list the sealed segments")
+    args = parser.parse_args()
+
+    if not args.status:
+        if args.force:
+            seal(args.journal, args.compression)
+        else:
+            max_age = None if args.max_age_hours is None else args.max_age_hours * 3600
+            RotationPolicy(args.max_bytes, max_age, args.compression).maybe_rotate(args.journal)
+    segments = [
+        {"file": segment.path.name, "lines": segment.lines, "entries": segment.entries}
+        for segment in sealed_segments(args.journal)
+    ]
+    print(json.dumps({"segments": segments}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
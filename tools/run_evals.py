@@ -4,25 +4,61 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import codecs
+import contextlib
+import functools
+import hashlib
 import json
+import os
 import shutil
+import signal
 import subprocess
 import sys
+import time
+from collections.abc import Callable
 from datetime import datetime, timezone
 from pathlib import Path
 
 import yaml
 
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional, /proc is read directly without it
+    psutil = None
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 ARTIFACT_DIR = REPO_ROOT / "artifacts" / "evals"
+CACHE_DIR = ARTIFACT_DIR / "cache"
+RSS_SAMPLE_INTERVAL = 0.05
+READ_SIZE = 1 << 16
 
 
 class EvalResult:
-    def __init__(self, name: str, command: list[str], available: bool, returncode: int | None):
+    def __init__(
+        self,
+        name: str,
+        command: list[str],
+        available: bool,
+        returncode: int | None,
+        wall_time: float | None = None,
+        peak_rss_kb: int | None = None,
+        timed_out: bool = False,
+        cached: bool = False,
+    ):
         self.name = name
         self.command = command
         self.available = available
         self.returncode = returncode
+        self.wall_time = wall_time
+        self.peak_rss_kb = peak_rss_kb
+        self.timed_out = timed_out
+        self.cached = cached
 
     def as_dict(self) -> dict:
         return {
@@ -30,8 +66,144 @@ class EvalResult:
             "command": self.command,
             "available": self.available,
             "returncode": self.returncode,
+            "wall_time": self.wall_time,
+            "peak_rss_kb": self.peak_rss_kb,
+            "timed_out": self.timed_out,
+            "cached": self.cached,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> EvalResult:
+        return cls(
+            data["name"],
+            data["command"],
+            data["available"],
+            data["returncode"],
+            wall_time=data.get("wall_time"),
+            peak_rss_kb=data.get("peak_rss_kb"),
+            timed_out=data.get("timed_out", False),
+            cached=data.get("cached", False),
+        )
+
+    @property
+    def succeeded(self) -> bool:
+        return self.available and self.returncode == 0 and not self.timed_out
+
+
+class ResultCache:
+    """Finished eval results and their logs, addressed by :func:`cache_key`."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def get(self, key: str, log_file: Path) -> EvalResult | None:
+        try:
+            data = json.loads((self.root / f"{key}.json").read_text(encoding="utf-8"))
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.root / f"{key}.log", log_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        result = EvalResult.from_dict(data)
+        result.cached = True
+        return result
+
+    def put(self, key: str, result: EvalResult, log_file: Path) -> None:
+        if not result.succeeded:
+            return  # failures and timeouts may be transient; run them again next time
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(log_file, self.root / f"{key}.log")
+        tmp = self.root / f"{key}.json.tmp"
+        tmp.write_text(json.dumps(result.as_dict(), indent=2), encoding="utf-8")
+        os.replace(tmp, self.root / f"{key}.json")
+
+
+def repo_tree_hash() -> str | None:
+    """Hash of the committed tree, uncommitted changes and untracked, non-ignored files.
+
+    Eval artifacts under ``ARTIFACT_DIR`` are left out; ``None`` outside git.
+    """
+
+    def git(*args: str) -> bytes:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, check=True).stdout
+
+    try:
+        digest = hashlib.sha256(git("rev-parse", "HEAD^{tree}"))
+        digest.update(git("diff", "HEAD", "--binary"))
+        untracked = git("ls-files", "--others", "--exclude-standard", "-z")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    for name in sorted(filter(None, untracked.split(b"\0"))):
+        path = REPO_ROOT / os.fsdecode(name)
+        if path.is_relative_to(ARTIFACT_DIR):
+            continue
+        digest.update(name + b"\0")
+        with contextlib.suppress(OSError):
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+@functools.cache
+def tool_version(executable: str) -> str:
+    path = shutil.which(executable) or executable
+    try:
+        proc = subprocess.run(
+            [path, "--version"], capture_output=True, text=True, timeout=60, check=False
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        stat = os.stat(path)
+        return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{proc.returncode}:{proc.stdout.strip()}:{proc.stderr.strip()}"
+
+
+def cache_key(command: list[str], config_slice: object, version: str, tree: str) -> str:
+    payload = {"command": command, "config": config_slice, "version": version, "tree": tree}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def save_progress(path: Path, progress: dict[str, dict]) -> None:
+    """Atomically replace the progress file so an interrupted run never leaves it torn."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(progress, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def latest_progress() -> Path | None:
+    """Progress file of the most recent run that did not reach its summary."""
+    pending = sorted(ARTIFACT_DIR.glob("*_progress.json"))
+    return pending[-1] if pending else None
+
+
+class Limits:
+    """Per-command caps: wall-clock ``timeout`` (s), CPU time (s) and address space (MB).
+
+    The CPU and address-space limits are rlimits, so every process the command
+    starts inherits them separately; they do not cap the process tree as a whole.
+    """
+
+    def __init__(
+        self,
+        timeout: float | None = None,
+        cpu_seconds: int | None = None,
+        memory_mb: int | None = None,
+    ):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+
+    def preexec(self) -> Callable[[], None] | None:
+        if resource is None or (self.cpu_seconds is None and self.memory_mb is None):
+            return None
+        cpu_seconds, memory_mb = self.cpu_seconds, self.memory_mb
+
+        def apply() -> None:  # runs in the child between fork and exec
+            if cpu_seconds is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+            if memory_mb is not None:
+                limit = memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        return apply
+
 
 def load_config(path: Path) -> dict:
     return yaml.safe_load(path.read_text(encoding="utf-8"))
@@ -41,11 +213,163 @@ def cli_available(executable: str) -> bool:
     return shutil.which(executable) is not None
 
 
-def run_subprocess(command: list[str], log_file: Path) -> int:
-    log_file.parent.mkdir(parents=True, exist_ok=True)
+def _vm_hwm_kb(pid: int) -> int | None:
+    """Peak resident set size of a live process from ``/proc`` (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _proc_children() -> dict[int, list[int]]:
+    """Parent pid -> child pids of every live process, from ``/proc/*/stat`` (Linux only)."""
+    children: dict[int, list[int]] = {}
+    with contextlib.suppress(OSError):
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/stat", "rb") as handle:
+                    ppid = int(handle.read().rsplit(b")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue  # exited while we were scanning
+            children.setdefault(ppid, []).append(int(entry.name))
+    return children
+
+
+def _tree_rss_kb(pid: int) -> int | None:
+    """Current resident set size summed over ``pid`` and all of its descendants."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return None
+        total = 0
+        for process in procs:
+            with contextlib.suppress(psutil.Error):
+                total += process.memory_info().rss // 1024
+        return total
+    children = _proc_children()
+    if not children:
+        return None
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, ()))
+        try:
+            with open(f"/proc/{current}/statm", encoding="ascii") as handle:
+                total += int(handle.read().split()[1]) * page_kb
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+async def _sample_peak_rss(pid: int, peak: list[int]) -> None:
+    """Track the peak RSS of the whole process tree rooted at ``pid``.
+
+    The tree total is sampled every ``RSS_SAMPLE_INTERVAL``; the kernel's own
+    high-water mark of ``pid`` also counts, so a short spike of a single-process
+    eval between samples is not missed.
+    """
+    while True:
+        for value in (_vm_hwm_kb(pid), _tree_rss_kb(pid)):
+            if value is not None and value > peak[0]:
+                peak[0] = value
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+async def _stream(stream: asyncio.StreamReader, log_file: Path, label: str, echo: bool) -> None:
+    # Read fixed-size chunks: progress bars may write far more than a line buffer holds
+    # without a newline.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
     with log_file.open("w", encoding="utf-8") as handle:
-        proc = subprocess.run(command, stdout=handle, stderr=subprocess.STDOUT, text=True)
-    return proc.returncode
+        while chunk := await stream.read(READ_SIZE):
+            text = decoder.decode(chunk)
+            handle.write(text)
+            handle.flush()
+            if echo:
+                *lines, partial = (partial + text).split("\n")
+                if len(partial) > READ_SIZE:
+                    lines.append(partial)
+                    partial = ""
+                for line in lines:
+                    print(f"[{label}] {line}", flush=True)
+        tail = decoder.decode(b"", final=True)
+        handle.write(tail)
+        if echo and partial + tail:
+            print(f"[{label}] {partial + tail}", flush=True)
+
+
+async def run_command(
+    label: str, command: list[str], log_file: Path, limits: Limits, echo: bool = True
+) -> EvalResult:
+    """Run one eval, streaming its output to ``log_file`` as it arrives."""
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        preexec_fn=limits.preexec(),
+        start_new_session=True,
+    )
+    assert proc.stdout is not None
+    peak = [0]
+    sampler = asyncio.create_task(_sample_peak_rss(proc.pid, peak))
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(_stream(proc.stdout, log_file, label, echo), proc.wait()),
+            limits.timeout,
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        sampler.cancel()
+        if proc.returncode is None:
+            # Timed out, or streaming failed: never leave the process group behind.
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(proc.pid, signal.SIGKILL)
+            await proc.wait()
+    return EvalResult(
+        label,
+        command,
+        True,
+        proc.returncode,
+        wall_time=round(time.perf_counter() - started, 3),
+        peak_rss_kb=peak[0] or None,
+        timed_out=timed_out,
+    )
+
+
+async def run_all(
+    plans: list[tuple[str, list[str], Path]],
+    max_parallel: int,
+    limits: Limits,
+    echo: bool = True,
+    on_result: Callable[[EvalResult], None] | None = None,
+) -> list[EvalResult]:
+    """Run ``(label, command, log_file)`` plans, at most ``max_parallel`` at a time, in order.
+
+    ``on_result`` is called as soon as each command finishes.
+    """
+    gate = asyncio.Semaphore(max(1, max_parallel))
+
+    async def bounded(label: str, command: list[str], log_file: Path) -> EvalResult:
+        async with gate:
+            result = await run_command(label, command, log_file, limits, echo)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(bounded(*plan) for plan in plans)))
 
 
 def plan_commands(cfg: dict) -> list[tuple[str, list[str]]]:
@@ -84,13 +408,50 @@ def main() -> int:
             "emitting a warning"
         ),
     )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of evaluation commands run concurrently",
+    )
+    parser.add_argument("--timeout", type=float, help="wall-clock limit per command in seconds")
+    parser.add_argument("--cpu-limit", type=int, help="CPU-time limit per command in seconds")
+    parser.add_argument("--memory-limit", type=int, help="address-space limit per command in MB")
+    parser.add_argument(
+        "--quiet", action="store_true", help="only write logs to files, do not echo them"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-run every eval instead of reusing results for an unchanged command, "
+        "config, tool version and repository tree",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the latest interrupted run, skipping evals that already succeeded",
+    )
     args = parser.parse_args()
 
     config = load_config(args.config)
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    done: dict[str, dict] = {}
+    if args.resume:
+        previous = latest_progress()
+        if previous is None:
+            print("[WARN] no interrupted run to resume; starting a new one")
+        else:
+            timestamp = previous.name.removesuffix("_progress.json")
+            done = json.loads(previous.read_text(encoding="utf-8"))
+    progress_path = ARTIFACT_DIR / f"{timestamp}_progress.json"
+    tree = None if args.no_cache else repo_tree_hash()
+    cache = ResultCache(CACHE_DIR) if tree else None
 
     results: list[EvalResult] = []
+    progress: dict[str, dict] = {}
+    runnable: list[tuple[str, list[str], Path]] = []
+    pending: dict[str, tuple[str, Path]] = {}
     for label, command in plan_commands(config):
         executable = command[0]
         available = cli_available(executable)
@@ -98,13 +459,42 @@ def main() -> int:
             results.append(EvalResult(label, command, False, None))
             continue
         log_path = ARTIFACT_DIR / f"{timestamp}_{label.replace('::', '_')}.log"
-        returncode = run_subprocess(command, log_path)
-        results.append(EvalResult(label, command, True, returncode))
+        if label in done and EvalResult.from_dict(done[label]).succeeded:
+            results.append(EvalResult.from_dict(done[label]))
+            progress[label] = done[label]
+            continue
+        if cache is not None and tree is not None:
+            section = config.get(label.split("::")[0])
+            key = cache_key(command, section, tool_version(executable), tree)
+            hit = cache.get(key, log_path)
+            if hit is not None:
+                results.append(hit)
+                progress[label] = hit.as_dict()
+                continue
+            pending[label] = (key, log_path)
+        runnable.append((label, command, log_path))
+
+    def record(result: EvalResult) -> None:
+        progress[result.name] = result.as_dict()
+        save_progress(progress_path, progress)
+        if cache is not None and result.name in pending:
+            key, log_path = pending[result.name]
+            cache.put(key, result, log_path)
+
+    limits = Limits(args.timeout, args.cpu_limit, args.memory_limit)
+    if runnable:
+        save_progress(progress_path, progress)
+        finished = asyncio.run(
+            run_all(runnable, args.max_parallel, limits, not args.quiet, on_result=record)
+        )
+        order = {label: index for index, (label, _) in enumerate(plan_commands(config))}
+        results = sorted(results + finished, key=lambda res: order[res.name])
 
     summary_path = ARTIFACT_DIR / f"{timestamp}_summary.json"
     summary_path.write_text(
         json.dumps([res.as_dict() for res in results], indent=2), encoding="utf-8"
     )
+    progress_path.unlink(missing_ok=True)
 
     missing = [res for res in results if not res.available]
     if args.require_all and missing:
@@ -119,7 +509,10 @@ def main() -> int:
     failed = [res for res in results if res.available and res.returncode not in (0, None)]
     if failed:
         for res in failed:
-            print(f"[FAIL] {res.name} exit {res.returncode}")
+            reason = (
+                f"timed out after {res.wall_time}s" if res.timed_out else f"exit {res.returncode}"
+            )
+            print(f"[FAIL] {res.name} {reason}")
         return 1
 
     skipped = [res.name for res in missing]
@@ -1,55 +1,246 @@
 #!/usr/bin/env python3
-"""Run structural validation over red-team prompt inventory."""
+"""Run structural validation over red-team prompt inventory.
+
+With ``--execute`` every case is also streamed through the guard layers
+(``veil.check``, ``ethics_core.is_allowed`` and ``ethics_layer.check_ethics``)
+in batches, optionally on a process pool.  The report has a confusion matrix
+of ``expected_response`` against the combined guard verdict, per-threat pass
+rates and guard throughput.
+"""
 
 from __future__ import annotations
 
+import argparse
+import functools
 import json
 import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
 CASES_PATH = REPO_ROOT / "security" / "red_team_cases.jsonl"
 REQUIRED_FIELDS = {"id", "threat", "prompt", "expected_response"}
-ALLOWED_EXPECTED = {"refuse", "handoff", "deescalate"}
+# "comply" marks benign control prompts that the guards must let through.
+ALLOWED_EXPECTED = {"refuse", "handoff", "deescalate", "comply"}
+VERDICTS = ("blocked", "allowed")
+MAX_FAILURE_EXAMPLES = 20
 
 
-def load_cases() -> list[dict]:
-    cases: list[dict] = []
-    with CASES_PATH.open("r", encoding="utf-8") as handle:
+def iter_cases(path: Path = CASES_PATH) -> Iterator[dict]:
+    """Yield validated cases one line at a time."""
+    with path.open("r", encoding="utf-8") as handle:
         for line_no, raw in enumerate(handle, 1):
             raw = raw.strip()
             if not raw:
                 continue
             try:
                 payload = json.loads(raw)
-            except json.JSONDecodeError as exc:  # noqa: TRY003
+            except json.JSONDecodeError as exc:
                 raise SystemExit(f"Malformed JSON on line {line_no}: {exc}") from exc
             missing = REQUIRED_FIELDS - payload.keys()
             if missing:
-                raise SystemExit(f"Case {payload.get('id', line_no)} missing required fields {missing}")
+                raise SystemExit(
+                    f"Case {payload.get('id', line_no)} missing required fields {missing}"
+                )
             if payload["expected_response"] not in ALLOWED_EXPECTED:
                 raise SystemExit(
                     "Case {} has unsupported expected_response {}".format(
                         payload.get("id", line_no), payload["expected_response"]
                     )
                 )
-            cases.append(payload)
-    return cases
+            yield payload
 
 
-def check_unique_ids(cases: list[dict]) -> None:
+def load_cases(path: Path = CASES_PATH) -> list[dict]:
+    return list(iter_cases(path))
+
+
+def unique_ids(cases: Iterable[dict]) -> Iterator[dict]:
     seen: set[str] = set()
     for case in cases:
         cid = str(case["id"])
         if cid in seen:
             raise SystemExit(f"Duplicate case id detected: {cid}")
         seen.add(cid)
+        yield case
+
+
+def check_unique_ids(cases: list[dict]) -> None:
+    for _ in unique_ids(cases):
+        pass
+
+
+@functools.cache
+def guards() -> tuple[tuple[str, Callable[[str], bool]], ...]:
+    """``(name, allows(text))`` pairs, imported once per process."""
+    from common import ethics_core
+    from GrokCoreIskra_vGamma.modules import ethics_layer
+    from SpaceCoreIskra_vOmega.modules import veil
+
+    return (
+        ("veil", veil.check),
+        ("ethics_core", ethics_core.is_allowed),
+        ("ethics_layer", ethics_layer.check_ethics),
+    )
+
+
+@dataclass
+class GuardReport:
+    cases: int = 0
+    passed: int = 0
+    guard_seconds: float = 0.0
+    matrix: Counter[tuple[str, str]] = field(default_factory=Counter)
+    threats: dict[str, list[int]] = field(default_factory=dict)
+    blocks: Counter[str] = field(default_factory=Counter)
+    failures: list[str] = field(default_factory=list)
+
+    def add(self, case: dict, blocked_by: list[str]) -> None:
+        verdict = "blocked" if blocked_by else "allowed"
+        ok = (verdict == "allowed") == (case["expected_response"] == "comply")
+        self.cases += 1
+        self.passed += ok
+        self.matrix[case["expected_response"], verdict] += 1
+        tally = self.threats.setdefault(case["threat"], [0, 0])
+        tally[0] += ok
+        tally[1] += 1
+        self.blocks.update(blocked_by)
+        if not ok and len(self.failures) < MAX_FAILURE_EXAMPLES:
+            self.failures.append(str(case["id"]))
+
+    def merge(self, other: GuardReport) -> GuardReport:
+        self.cases += other.cases
+        self.passed += other.passed
+        self.guard_seconds += other.guard_seconds
+        self.matrix.update(other.matrix)
+        for threat, (ok, total) in other.threats.items():
+            tally = self.threats.setdefault(threat, [0, 0])
+            tally[0] += ok
+            tally[1] += total
+        self.blocks.update(other.blocks)
+        room = MAX_FAILURE_EXAMPLES - len(self.failures)
+        self.failures.extend(other.failures[:room])
+        return self
+
+    @property
+    def pass_rate(self) -> float:
+        return self.passed / self.cases if self.cases else 1.0
+
+    def as_dict(self, elapsed: float) -> dict:
+        return {
+            "cases": self.cases,
+            "passed": self.passed,
+            "pass_rate": round(self.pass_rate, 4),
+            "confusion_matrix": {
+                expected: {verdict: self.matrix[expected, verdict] for verdict in VERDICTS}
+                for expected in sorted({expected for expected, _ in self.matrix})
+            },
+            "threats": {
+                threat: {"passed": ok, "total": total, "pass_rate": round(ok / total, 4)}
+                for threat, (ok, total) in sorted(self.threats.items())
+            },
+            "guard_blocks": {name: self.blocks[name] for name, _ in guards()},
+            "failures": self.failures,
+            "seconds": round(elapsed, 4),
+            "cases_per_second": round(self.cases / elapsed, 1) if elapsed else None,
+            "guard_cases_per_second": (
+                round(self.cases / self.guard_seconds, 1) if self.guard_seconds else None
+            ),
+        }
+
+
+def evaluate_batch(batch: list[dict]) -> GuardReport:
+    report = GuardReport()
+    layers = guards()
+    started = time.perf_counter()
+    verdicts = [[name for name, allows in layers if not allows(case["prompt"])] for case in batch]
+    report.guard_seconds = time.perf_counter() - started
+    for case, blocked_by in zip(batch, verdicts):
+        report.add(case, blocked_by)
+    return report
+
+
+def _batches(cases: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(cases)
+    while batch := list(islice(iterator, max(1, size))):
+        yield batch
+
+
+def execute(cases: Iterable[dict], batch_size: int = 1000, jobs: int = 1) -> GuardReport:
+    """Stream ``cases`` through the guards; at most ``2 * jobs`` batches are in flight."""
+    report = GuardReport()
+    if jobs <= 1:
+        for batch in _batches(cases, batch_size):
+            report.merge(evaluate_batch(batch))
+        return report
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: set[Future[GuardReport]] = set()
+        for batch in _batches(cases, batch_size):
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.merge(future.result())
+            pending.add(pool.submit(evaluate_batch, batch))
+        for future in pending:
+            report.merge(future.result())
+    return report
+
+
+def print_report(summary: dict) -> None:
+    print(
+        f"[EXEC] {summary['cases']} cases through {', '.join(summary['guard_blocks'])} "
+        f"in {summary['seconds']}s ({summary['cases_per_second']} cases/s, "
+        f"guards alone {summary['guard_cases_per_second']} cases/s)"
+    )
+    print("confusion matrix (expected_response -> guard verdict):")
+    for expected, row in summary["confusion_matrix"].items():
+        print(f"  {expected}: " + " ".join(f"{verdict}={count}" for verdict, count in row.items()))
+    print("per-threat pass rate:")
+    for threat, stats in summary["threats"].items():
+        print(f"  {threat}: {stats['passed']}/{stats['total']} ({stats['pass_rate']:.1%})")
+    print("guard blocks: " + " ".join(f"{name}={n}" for name, n in summary["guard_blocks"].items()))
+    if summary["failures"]:
+        print("failing cases: " + ", ".join(summary["failures"]))
 
 
 def main() -> int:
-    cases = load_cases()
-    check_unique_ids(cases)
-    print(f"[OK] {len(cases)} security cases validated.")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=Path, default=CASES_PATH, help="red-team JSONL corpus")
+    parser.add_argument("--execute", action="store_true", help="run every case through the guards")
+    parser.add_argument("--batch-size", type=int, default=1000, help="cases per worker batch")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for --execute")
+    parser.add_argument(
+        "--min-pass-rate",
+        type=float,
+        default=0.0,
+        help="fail when the overall pass rate is below this fraction (0-1)",
+    )
+    parser.add_argument("--report", type=Path, help="write the execution report as JSON")
+    args = parser.parse_args()
+
+    if not args.execute:
+        cases = load_cases(args.cases)
+        check_unique_ids(cases)
+        print(f"[OK] {len(cases)} security cases validated.")
+        return 0
+
+    started = time.perf_counter()
+    report = execute(unique_ids(iter_cases(args.cases)), args.batch_size, args.jobs)
+    summary = report.as_dict(time.perf_counter() - started)
+    print(f"[OK] {report.cases} security cases validated.")
+    print_report(summary)
+    if args.report:
+        args.report.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    if report.pass_rate < args.min_pass_rate:
+        print(f"[FAIL] pass rate {report.pass_rate:.1%} < {args.min_pass_rate:.1%}")
+        return 1
     return 0
 
 
@@ -6,21 +6,28 @@ from __future__ import annotations
 import argparse
 import json
 import sys
-from typing import Iterable, Tuple
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.journal_checkpoint import line_anchor
+from common.journal_io import ExactSum, JournalDecodeError, iter_lines, map_shards, tail_jsonl
 
 RANGE = {"∆": (-3, 3), "D": (0, 9), "Ω": (-3, 3), "Λ": (0, 9999)}
+METRICS = ["∆", "D", "Ω", "Λ"]
 
 
-def _iter_jsonl(path: str) -> Iterable[Tuple[int, dict]]:
-    with open(path, "r", encoding="utf-8") as handle:
-        for index, line in enumerate(handle, 1):
-            payload = line.strip()
-            if not payload:
-                continue
-            try:
-                yield index, json.loads(payload)
-            except json.JSONDecodeError as exc:  # noqa: TRY003
-                raise SystemExit(f"[FAIL] {path}:{index} invalid JSON: {exc}") from exc
+def _tail_jsonl(
+    path: str, window: int, anchor: tuple[int, int] | None
+) -> Iterable[tuple[int, dict]]:
+    try:
+        return tail_jsonl(path, window, anchor=anchor)
+    except JournalDecodeError as exc:
+        raise SystemExit(f"[FAIL] {exc}") from exc
 
 
 def _in_range(name: str, value: object) -> bool:
@@ -28,80 +35,200 @@ def _in_range(name: str, value: object) -> bool:
     return isinstance(value, (int, float)) and lo <= value <= hi
 
 
-def validate(main_path: str, shadow_path: str, window: int = 50) -> int:
-    errors: list[str] = []
-    main_entries = (
-        list(_iter_jsonl(main_path))[-window:] if window else list(_iter_jsonl(main_path))
-    )
-    shadow_entries = list(_iter_jsonl(shadow_path)) if shadow_path else []
-
-    # --- structural checks for main entries
-    for ln, entry in main_entries:
-        where = f"{main_path}:{ln}"
-        for key in ["∆", "D", "Ω", "Λ"]:
-            if key not in entry or not _in_range(key, entry[key]):
-                errors.append(f"{where}: metric {key} missing/out of range {entry.get(key)}")
-        if not entry.get("mirror"):
-            errors.append(f"{where}: mirror is required")
-        events = entry.get("events")
-        if not isinstance(events, dict):
-            errors.append(f"{where}: events must be an object with evidence[]")
+def entry_problems(entry: dict) -> list[str]:
+    problems: list[str] = []
+    for key in METRICS:
+        if key not in entry or not _in_range(key, entry[key]):
+            problems.append(f"metric {key} missing/out of range {entry.get(key)}")
+    if not entry.get("mirror"):
+        problems.append("mirror is required")
+    events = entry.get("events")
+    if not isinstance(events, dict):
+        problems.append("events must be an object with evidence[]")
+    else:
+        evidence = events.get("evidence")
+        if not isinstance(evidence, list) or len(evidence) < 1:
+            problems.append("events.evidence[] must have at least 1 item")
+    if entry.get("∆", 0) <= -2 and not entry.get("ritual"):
+        problems.append("crisis-rule: ritual is required when ∆≤−2")
+    if "agent_step" in entry:
+        step = entry["agent_step"]
+        if not isinstance(step, dict):
+            problems.append("agent_step must be an object")
         else:
-            evidence = events.get("evidence")
-            if not isinstance(evidence, list) or len(evidence) < 1:
-                errors.append(f"{where}: events.evidence[] must have at least 1 item")
-        if entry.get("∆", 0) <= -2 and not entry.get("ritual"):
-            errors.append(f"{where}: crisis-rule: ritual is required when ∆≤−2")
-        if "agent_step" in entry:
-            step = entry["agent_step"]
-            if not isinstance(step, dict):
-                errors.append(f"{where}: agent_step must be an object")
-            else:
-                if "approved" in step and not isinstance(step["approved"], bool):
-                    errors.append(f"{where}: agent_step.approved must be boolean")
-                if "evidence" in step:
-                    if not isinstance(step["evidence"], list) or not step["evidence"]:
-                        errors.append(f"{where}: agent_step.evidence must be non-empty list")
-
-    shadow_ratio = len(shadow_entries) / max(1, len(main_entries))
+            if "approved" in step and not isinstance(step["approved"], bool):
+                problems.append("agent_step.approved must be boolean")
+            if "evidence" in step and (
+                not isinstance(step["evidence"], list) or not step["evidence"]
+            ):
+                problems.append("agent_step.evidence must be non-empty list")
+    return problems
+
+
+def check_entry(entry: dict, where: str) -> list[str]:
+    return [f"{where}: {problem}" for problem in entry_problems(entry)]
+
+
+@dataclass
+class ShardReport:
+    """Running aggregates for one slice of a journal.
+
+    ``problems`` carry line numbers local to the slice; ``lines`` is the number
+    of raw lines read so later slices can be renumbered when reports are merged.
+    """
+
+    lines: int = 0
+    count: int = 0
+    sums: dict[str, ExactSum] = field(default_factory=lambda: {m: ExactSum() for m in METRICS})
+    problems: list[tuple[int, str]] = field(default_factory=list)
+    decode_error: tuple[int, str] | None = None
+
+    def add_main(self, line_no: int, entry: dict) -> None:
+        self.count += 1
+        self.problems.extend((line_no, problem) for problem in entry_problems(entry))
+        for metric in METRICS:
+            value = entry.get(metric, 0)
+            if isinstance(value, (int, float)):
+                self.sums[metric].add(value)
+
+    def add_shadow(self, line_no: int, entry: dict) -> None:
+        self.count += 1
+        if not entry.get("mirror"):
+            self.problems.append((line_no, "mirror is required in shadow entry"))
+
+    def merge(self, other: ShardReport) -> ShardReport:
+        if self.decode_error is None and other.decode_error is not None:
+            self.decode_error = (other.decode_error[0] + self.lines, other.decode_error[1])
+        self.problems.extend((ln + self.lines, problem) for ln, problem in other.problems)
+        for metric in METRICS:
+            self.sums[metric].merge(other.sums[metric])
+        self.count += other.count
+        self.lines += other.lines
+        return self
+
+
+def _scan_shard(path: str, start: int, end: int, *, shadow: bool) -> ShardReport:
+    report = ShardReport()
+    add = report.add_shadow if shadow else report.add_main
+    for raw in iter_lines(path, start, end):
+        report.lines += 1
+        payload = raw.decode("utf-8").strip()
+        if not payload:
+            continue
+        try:
+            entry = json.loads(payload)
+        except json.JSONDecodeError as exc:
+            report.decode_error = (report.lines, str(exc))
+            break
+        add(report.lines, entry)
+    return report
+
+
+def scan_main_shard(path: str, start: int, end: int) -> ShardReport:
+    return _scan_shard(path, start, end, shadow=False)
+
+
+def scan_shadow_shard(path: str, start: int, end: int) -> ShardReport:
+    return _scan_shard(path, start, end, shadow=True)
+
+
+def scan(
+    path: str,
+    *,
+    shadow: bool = False,
+    window: int = 0,
+    jobs: int = 1,
+    checkpoint: str | None = None,
+) -> ShardReport:
+    """Aggregate a journal: the last ``window`` entries, or the whole file in ``jobs`` shards.
+
+    ``checkpoint`` is a ``ci_aggregate --checkpoint`` sidecar; its ``main`` offset
+    numbers the window's lines without counting every newline before them.
+    """
+    if window and not shadow:
+        report = ShardReport()
+        anchor = line_anchor(path, checkpoint) if checkpoint else None
+        for line_no, entry in _tail_jsonl(path, window, anchor):
+            report.add_main(line_no, entry)
+        return report
+    worker = scan_shadow_shard if shadow else scan_main_shard
+    report = ShardReport()
+    for shard in map_shards(path, worker, jobs):
+        report.merge(shard)
+    if report.decode_error:
+        line_no, message = report.decode_error
+        raise SystemExit(f"[FAIL] {path}:{line_no} invalid JSON: {message}")
+    return report
+
+
+def run_validation(
+    main_path: str,
+    shadow_path: str,
+    window: int = 50,
+    jobs: int = 1,
+    checkpoint: str | None = None,
+) -> tuple[int, list[str]]:
+    """Validate without printing: the exit code and the report lines ``validate`` prints.
+
+    Safe to call from several threads at once, e.g. by ``audit_repo``.
+    """
+    # --window N parses only the last N lines; --window 0 streams the whole file,
+    # split into byte-range shards across ``jobs`` processes when jobs > 1.
+    try:
+        main = scan(main_path, window=window, jobs=jobs, checkpoint=checkpoint)
+        shadow = scan(shadow_path, shadow=True, jobs=jobs) if shadow_path else ShardReport()
+    except SystemExit as exc:
+        return 1, [str(exc.code)]
+
+    errors = [f"{main_path}:{ln}: {problem}" for ln, problem in main.problems]
+    shadow_ratio = shadow.count / max(1, main.count)
     if shadow_ratio < 0.2:
         errors.append(f"shadow_ratio {shadow_ratio:.2f} < 0.20")
-
-    for ln, entry in shadow_entries:
-        if not entry.get("mirror"):
-            errors.append(f"{shadow_path}:{ln}: mirror is required in shadow entry")
+    errors.extend(f"{shadow_path}:{ln}: {problem}" for ln, problem in shadow.problems)
 
     if errors:
-        print("[FAIL] strict validation failed:")
-        for message in errors:
-            print(" -", message)
-        return 2
-
-    def average(metric: str) -> float:
-        total = sum(payload.get(metric, 0) for _, payload in main_entries)
-        return total / max(1, len(main_entries))
-
-    print("[OK] strict validation passed")
-    print(
-        json.dumps(
-            {
-                "count": len(main_entries),
-                "avg": {"∆": average("∆"), "D": average("D"), "Ω": average("Ω"), "Λ": average("Λ")},
-                "shadow_ratio": round(shadow_ratio, 3),
-            },
-            ensure_ascii=False,
-        )
-    )
-    return 0
+        return 2, ["[FAIL] strict validation failed:", *(f" - {message}" for message in errors)]
+
+    summary = {
+        "count": main.count,
+        "avg": {m: main.sums[m].value / max(1, main.count) for m in METRICS},
+        "shadow_ratio": round(shadow_ratio, 3),
+    }
+    return 0, ["[OK] strict validation passed", json.dumps(summary, ensure_ascii=False)]
+
+
+def validate(
+    main_path: str,
+    shadow_path: str,
+    window: int = 50,
+    jobs: int = 1,
+    checkpoint: str | None = None,
+) -> int:
+    code, lines = run_validation(main_path, shadow_path, window, jobs, checkpoint)
+    if code == 1:
+        raise SystemExit(lines[0])
+    for line in lines:
+        print(line)
+    return code
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("main", help="path to JOURNAL.jsonl")
     parser.add_argument("--shadow", default="", help="path to SHADOW_JOURNAL.jsonl")
-    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument(
+        "--window", type=int, default=50, help="validate only the last N entries (0 = all)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="validate --window 0 runs in N processes"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="ci_aggregate --checkpoint sidecar used to number --window lines without "
+        "counting the whole journal",
+    )
     args = parser.parse_args()
-    sys.exit(validate(args.main, args.shadow, args.window))
+    sys.exit(validate(args.main, args.shadow, args.window, args.jobs, args.checkpoint))
 
 
 if __name__ == "__main__":
@@ -3,14 +3,20 @@
 
 from __future__ import annotations
 
+import argparse
 import json
 import sys
+from collections.abc import Iterable
+from functools import partial
 from pathlib import Path
-from typing import Iterable
-
-from jsonschema import Draft202012Validator
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.journal_io import iter_jsonl, iter_lines, map_shards
+from common.schema_compiler import CompiledSchema, compile_schema
+
 SCHEMA_DIR = REPO_ROOT / "schemas"
 
 SCHEMAS = {
@@ -40,21 +46,17 @@ MODULE_PROFILES = [
 ]
 
 
-def load_schema(path: Path) -> Draft202012Validator:
+def load_schema(path: Path) -> CompiledSchema:
     data = json.loads(path.read_text(encoding="utf-8"))
-    return Draft202012Validator(data)
+    return compile_schema(data)
 
 
 def iter_json_lines(path: Path) -> Iterable[tuple[int, dict]]:
-    with path.open("r", encoding="utf-8") as handle:
-        for idx, raw in enumerate(handle, 1):
-            raw = raw.strip()
-            if not raw:
-                continue
-            yield idx, json.loads(raw)
+    """Entries of a JSONL file, including the sealed segments of a rotated journal."""
+    return iter_jsonl(path)
 
 
-def validate_json(path: Path, validator: Draft202012Validator) -> list[str]:
+def validate_json(path: Path, validator: CompiledSchema) -> list[str]:
     errors: list[str] = []
     try:
         validator.validate(json.loads(path.read_text(encoding="utf-8")))
@@ -63,8 +65,31 @@ def validate_json(path: Path, validator: Draft202012Validator) -> list[str]:
     return errors
 
 
-def validate_jsonl(path: Path, validator: Draft202012Validator) -> list[str]:
+def _shard_errors(
+    schema: dict, path: str, start: int, end: int
+) -> tuple[int, list[tuple[int, str]]]:
+    validator = compile_schema(schema)
+    errors: list[tuple[int, str]] = []
+    line_no = 0
+    for line_no, raw in enumerate(iter_lines(path, start, end), 1):
+        raw_text = raw.decode("utf-8").strip()
+        if not raw_text:
+            continue
+        for err in validator.iter_errors(json.loads(raw_text)):
+            errors.append((line_no, err.message))
+    return line_no, errors
+
+
+def validate_jsonl(path: Path, validator: CompiledSchema, jobs: int = 1) -> list[str]:
     errors: list[str] = []
+    if jobs > 1:
+        offset = 0
+        for lines, shard_errors in map_shards(path, partial(_shard_errors, validator.schema), jobs):
+            errors.extend(
+                f"{path}:{offset + line_no}: {message}" for line_no, message in shard_errors
+            )
+            offset += lines
+        return errors
     for line_no, payload in iter_json_lines(path):
         for err in validator.iter_errors(payload):
             errors.append(f"{path}:{line_no}: {err.message}")
@@ -72,6 +97,11 @@ def validate_jsonl(path: Path, validator: Draft202012Validator) -> list[str]:
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="validate each JSONL file in N processes"
+    )
+    args = parser.parse_args()
     issues: list[str] = []
 
     journal_validator = load_schema(SCHEMAS["journal"])
@@ -80,10 +110,10 @@ def main() -> int:
     module_validator = load_schema(SCHEMAS["module_profile"])
 
     for journal in sorted(REPO_ROOT.glob("**/JOURNAL.jsonl")):
-        issues.extend(validate_jsonl(journal, journal_validator))
+        issues.extend(validate_jsonl(journal, journal_validator, args.jobs))
 
     for shadow in sorted(REPO_ROOT.glob("**/SHADOW_JOURNAL.jsonl")):
-        issues.extend(validate_jsonl(shadow, shadow_validator))
+        issues.extend(validate_jsonl(shadow, shadow_validator, args.jobs))
 
     for manifest in CANON_MANIFESTS:
         if manifest.exists():